@@ -44,6 +44,7 @@ INSTALLED_APPS = [
     'django.contrib.sessions',
     'django.contrib.messages',
     'django.contrib.staticfiles',
+    'django.contrib.postgres',
     'rest_framework',
     'rest_framework.authtoken',
     'django_filters',
@@ -100,6 +101,27 @@ DATABASES = {
 
 AUTH_USER_MODEL = 'users.User'
 
+# Cache
+# https://docs.djangoproject.com/en/4.0/topics/cache/
+# В кэше лежат метки версий, по которым воркеры gunicorn и команды
+# управления узнают об изменениях друг друга, поэтому кэш должен быть общим
+# для всех процессов: по умолчанию файлы, при нескольких серверах memcached
+
+CACHES = {
+    'default': {
+        'BACKEND': os.getenv(
+            'CACHE_BACKEND',
+            'django.core.cache.backends.filebased.FileBasedCache'
+        ),
+        'LOCATION': os.getenv(
+            'CACHE_LOCATION', os.path.join(BASE_DIR, 'cache')
+        ),
+        'OPTIONS': {
+            'MAX_ENTRIES': int(os.getenv('CACHE_MAX_ENTRIES', 100000)),
+        },
+    }
+}
+
 # Password validation
 # https://docs.djangoproject.com/en/4.0/ref/settings/#auth-password-validators
 
@@ -187,6 +209,14 @@ DJOSER = {
 
 SHOPPING_CART_FILE_NAME = 'shopping_list.txt'
 
+# TTF-шрифт с кириллицей для PDF-версии списка покупок
+SHOPPING_CART_PDF_FONT = os.getenv(
+    'SHOPPING_CART_PDF_FONT', '/usr/share/fonts/truetype/dejavu/DejaVuSans.ttf'
+)
+
+# Время жизни готового файла списка покупок в кэше, в секундах
+SHOPPING_CART_CACHE_TIMEOUT = 60 * 60
+
 # Минимальное количество символов для username
 MIN_LEN_FOR_USERNAME = 5
 
@@ -211,6 +241,11 @@ CANT_SUBSCRIBE_TO_YOURSELF = 'Нельзя подписываться на са
 # Уже подписан на этого пользователя
 ALREADY_SIGNED = 'Вы уже подписаны на пользователя'
 
+# Число рецептов автора в списке подписок: по умолчанию и максимальное
+SUBSCRIPTION_RECIPES_LIMIT = 10
+
+SUBSCRIPTION_RECIPES_MAX_LIMIT = 50
+
 # Минимальное время приготовления
 MIN_COOKING_TIME = 'Время приготовления не может быть меньше 1-ой минуты!'
 
@@ -228,4 +263,112 @@ THE_FIELD_WITH_INGREDIENTS_CANNOT_BE_EMPTY = 'Поле с ингредиента
 
 NOT_REPEATS_INGREDIENTS = 'В рецепте не должно быть повторяющихся ингредиентов'
 
-MUST_BE_INTEGER = 'Количество ингредиентов должно быть целым числом'
\ No newline at end of file
+MUST_BE_INTEGER = 'Количество ингредиентов должно быть целым числом'
+
+# Время жизни закэшированного представления рецепта, в секундах
+RECIPE_CACHE_TIMEOUT = 60 * 60 * 24
+
+# Версия формата закэшированного рецепта, менять при изменении RecipeSerializer
+RECIPE_CACHE_VERSION = 1
+
+# Хранилище множеств избранного, корзины и подписок пользователей.
+# CacheMembershipBackend использует общий кэш и видит изменения из всех
+# воркеров. LocalMembershipBackend держит множества в памяти процесса и
+# не узнает об изменениях в других процессах, поэтому подходит только
+# для запуска в одном процессе
+MEMBERSHIP_BACKEND = os.getenv(
+    'MEMBERSHIP_BACKEND', 'recipes.membership.CacheMembershipBackend'
+)
+
+# Максимальное число множеств в памяти процесса (вытеснение по LRU)
+MEMBERSHIP_MAX_ENTRIES = 10000
+
+# Время жизни множества в общем кэше, в секундах
+MEMBERSHIP_CACHE_TIMEOUT = 60 * 60
+
+# Сколько идентификаторов из множества членства фильтр подставляет в
+# запрос списком; для больших множеств используется подзапрос EXISTS
+MEMBERSHIP_FILTER_MAX_IDS = 500
+
+# Максимальное число подсказок при поиске ингредиента по названию
+INGREDIENT_SEARCH_LIMIT = 20
+
+# Как часто обновлять порядок подсказок по популярности, в секундах
+INGREDIENT_INDEX_TTL = 60 * 10
+
+# Доля общих триграмм для нечеткого совпадения названия ингредиента
+INGREDIENT_SIMILARITY = 0.25
+
+# Конфигурация полнотекстового поиска PostgreSQL
+SEARCH_CONFIG = 'russian'
+
+# Минимальное триграммное сходство слова при нечетком поиске рецептов
+SEARCH_TRIGRAM_SIMILARITY = 0.3
+
+# Сколько рецептов обновлять одним UPDATE при заполнении поисковых векторов
+SEARCH_BATCH_SIZE = 1000
+
+# Варианты изображения рецепта: имя и максимальные ширина и высота
+IMAGE_VARIANTS = {
+    'thumbnail': (320, 320),
+    'medium': (960, 960),
+}
+
+IMAGE_VARIANT_FORMAT = 'WEBP'
+
+IMAGE_VARIANT_QUALITY = 80
+
+IMAGE_VARIANT_DIR = 'recipes/variants/'
+
+# Таблицы больше этого размера считаются в админке по статистике PostgreSQL
+ADMIN_ESTIMATED_COUNT_THRESHOLD = 50000
+
+# Потоки для построения вариантов; 0 - строить сразу после фиксации
+IMAGE_WORKERS = int(os.getenv('IMAGE_WORKERS', 2))
+
+# Сколько последних рецептов автора попадает в ленту при подписке
+FEED_BACKFILL_LIMIT = 100
+
+# Размер пачки записей ленты при рассылке рецепта подписчикам
+FEED_BATCH_SIZE = 1000
+
+# Вес добавления в избранное и в корзину в рейтингах рецептов
+RANKING_WEIGHTS = {
+    'favorite': 2.0,
+    'shopping_cart': 1.0,
+}
+
+# Период полураспада рейтинга в трендах, в секундах
+TRENDING_HALF_LIFE = 60 * 60 * 24 * 3
+
+# Начальная точка отсчета рейтинга в трендах (Unix time). Вклад события
+# растет как 2 ** ((t - точка отсчета) / TRENDING_HALF_LIFE), поэтому
+# накопленные рейтинги не нужно пересчитывать при каждом событии
+TRENDING_EPOCH = 1704067200
+
+# Через сколько периодов полураспада точка отсчета трендов переносится
+# на текущий момент, а рейтинги трендов масштабируются
+TRENDING_REBASE_PERIODS = 30
+
+# Число событий, обрабатываемых за одну транзакцию
+RANKING_BATCH_SIZE = 5000
+
+# Сколько похожих рецептов хранится и отдается для каждого рецепта
+SIMILAR_RECIPES_COUNT = 10
+
+# Вес совпадения тегов в сходстве рецептов (сходство по ингредиентам - 1)
+SIMILAR_TAG_BOOST = 0.25
+
+# Подбор рецептов по продуктам: число результатов и продуктов в запросе
+PANTRY_RESULTS_LIMIT = 20
+
+PANTRY_MAX_INGREDIENTS = 50
+
+# Как часто перестраивать индекс продуктов целиком, в секундах
+PANTRY_INDEX_TTL = 60 * 60
+
+# Сколько хранить журнал изменений состава (больше PANTRY_INDEX_TTL)
+PANTRY_CHANGES_RETENTION = 60 * 60 * 24
+
+# Запас при чтении журнала на транзакции, зафиксированные не по порядку
+PANTRY_CHANGES_OVERLAP = 60
@@ -1,7 +1,10 @@
 from django.contrib import admin
+from django.db import transaction
 
 from .models import (Favorite, Ingredient, IngredientsInRecipe, Recipe,
                      ShoppingCart)
+from .pagination import EstimatedCountPaginator
+from .signals import reporting_ingredient_changes
 
 
 class RecipeAdmin(admin.ModelAdmin):
@@ -10,22 +13,32 @@ class RecipeAdmin(admin.ModelAdmin):
 
     Атрибуты:
         list_display (tuple): Поля для отображения в списке записей.
+        list_select_related (tuple): Связи, загружаемые вместе со списком.
         search_fields (tuple): Поля для поиска в панели администратора.
         readonly_fields (tuple): Поля, доступные только для чтения в панели администратора.
         list_filter (tuple): Поля для фильтрации списка записей.
+        raw_id_fields (tuple): Связи, которые вводятся по идентификатору.
+        paginator (type): Пагинатор с оценкой числа строк.
+        show_full_result_count (bool): Не считать все строки при поиске.
     """
 
     list_display = (
         'name',
         'author',
+        'favorites_count',
+        'pub_date',
     )
+    list_select_related = ('author',)
     search_fields = (
         'name',
         'author__username',
         'author__email',
     )
     readonly_fields = ('favorite_count',)
-    list_filter = ('author', 'name', 'tags',)
+    list_filter = ('tags',)
+    raw_id_fields = ('author',)
+    paginator = EstimatedCountPaginator
+    show_full_result_count = False
 
     def favorite_count(self, obj):
         """
@@ -37,7 +50,7 @@ class RecipeAdmin(admin.ModelAdmin):
         Возвращает:
             int: Количество избранных рецептов для данного рецепта.
         """
-        return obj.favorite_recipe.count()
+        return obj.favorites_count
 
 class IngredientAdmin(admin.ModelAdmin):
     """
@@ -53,20 +66,45 @@ class IngredientAdmin(admin.ModelAdmin):
         'name',
         'measurement_unit'
     )
-    search_fields = ('measurement_unit',)
+    search_fields = ('name', 'measurement_unit',)
     list_filter = ('measurement_unit',)
 
 class IngredientsInRecipeAdmin(admin.ModelAdmin):
     """
     Админка для модели IngredientsInRecipe.
 
+    Сохранение и удаление строк отправляют ingredients_changed, чтобы
+    суммы в списках покупок пользователей с этими рецептами в корзине
+    изменились вместе с составом.
+
     Атрибуты:
         list_display (tuple): Поля для отображения в списке записей.
+        list_select_related (tuple): Связи, загружаемые вместе со списком.
         search_fields (tuple): Поля для поиска в панели администратора.
+        autocomplete_fields (tuple): Связи с поиском вместо выпадающего списка.
     """
 
     list_display = ('recipe', 'ingredient', 'amount',)
+    list_select_related = ('recipe', 'ingredient')
     search_fields = ('recipe__name', 'ingredient__name',)
+    autocomplete_fields = ('recipe', 'ingredient')
+    paginator = EstimatedCountPaginator
+    show_full_result_count = False
+
+    def save_model(self, request, obj, form, change):
+        recipe_ids = {obj.recipe_id, form.initial.get('recipe')} - {None}
+        with reporting_ingredient_changes(recipe_ids):
+            super().save_model(request, obj, form, change)
+
+    def delete_model(self, request, obj):
+        with reporting_ingredient_changes([obj.recipe_id]):
+            super().delete_model(request, obj)
+
+    @transaction.atomic
+    def delete_queryset(self, request, queryset):
+        recipe_ids = queryset.values_list('recipe_id', flat=True)
+        with reporting_ingredient_changes(recipe_ids):
+            super().delete_queryset(request, queryset)
 
 class ShoppingCartAdmin(admin.ModelAdmin):
     """
@@ -74,15 +112,21 @@ class ShoppingCartAdmin(admin.ModelAdmin):
 
     Атрибуты:
         list_display (tuple): Поля для отображения в списке записей.
+        list_select_related (tuple): Связи, загружаемые вместе со списком.
         search_fields (tuple): Поля для поиска в панели администратора.
+        autocomplete_fields (tuple): Связи с поиском вместо выпадающего списка.
     """
 
     list_display = ('user', 'recipe')
+    list_select_related = ('user', 'recipe')
     search_fields = (
         'user__username',
         'user__email',
         'recipe__name',
     )
+    autocomplete_fields = ('user', 'recipe')
+    paginator = EstimatedCountPaginator
+    show_full_result_count = False
 
 class FavoriteAdmin(admin.ModelAdmin):
     """
@@ -90,15 +134,21 @@ class FavoriteAdmin(admin.ModelAdmin):
 
     Атрибуты:
         list_display (tuple): Поля для отображения в списке записей.
+        list_select_related (tuple): Связи, загружаемые вместе со списком.
         search_fields (tuple): Поля для поиска в панели администратора.
+        autocomplete_fields (tuple): Связи с поиском вместо выпадающего списка.
     """
 
     list_display = ('user', 'recipe')
+    list_select_related = ('user', 'recipe')
     search_fields = (
         'user__username',
         'user__email',
         'recipe__name',
     )
+    autocomplete_fields = ('user', 'recipe')
+    paginator = EstimatedCountPaginator
+    show_full_result_count = False
 
 
 admin.site.register(Recipe, RecipeAdmin)
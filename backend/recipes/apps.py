@@ -4,3 +4,11 @@ from django.apps import AppConfig
 class RecipesConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'recipes'
+
+    def ready(self):
+        from django.db.models.signals import post_migrate
+
+        from recipes import checks, signals  # noqa: F401
+        from recipes.search import create_search_indexes
+
+        post_migrate.connect(create_search_indexes, sender=self)
@@ -0,0 +1,140 @@
+import heapq
+import threading
+import time
+from bisect import bisect_left
+from collections import Counter
+
+from django.conf import settings
+from django.db.models import Count
+
+from recipes import reference
+from recipes.models import IngredientsInRecipe
+from recipes.versions import get_version
+
+# Символ больше любого другого: граница диапазона строк с общим префиксом
+MAX_CHAR = '\U0010ffff'
+
+
+def trigrams(text):
+    text = f'  {text} '
+    return {text[i:i + 3] for i in range(len(text) - 2)}
+
+
+class IngredientIndex:
+    """
+    Индекс ингредиентов для автодополнения в памяти процесса.
+
+    Названия хранятся в отсортированном списке в нижнем регистре, поэтому
+    совпадения по префиксу находятся бинарным поиском. Если их меньше
+    лимита, добавляются совпадения по подстроке, а если нет ни тех,
+    ни других - похожие названия по триграммам.
+
+    Атрибуты:
+        items (dict): Ингредиенты по идентификатору в виде словарей.
+        usage (dict): Число рецептов с ингредиентом.
+    """
+
+    def __init__(self, ingredients, usage):
+        self.items = {
+            ingredient['id']: ingredient for ingredient in ingredients
+        }
+        self.usage = usage
+        entries = sorted(
+            (ingredient['name'].casefold(), ingredient['id'])
+            for ingredient in ingredients
+        )
+        self.keys = [key for key, _ in entries]
+        self.ids = [ingredient_id for _, ingredient_id in entries]
+        self.trigrams = {}
+        for key, ingredient_id in entries:
+            for trigram in trigrams(key):
+                self.trigrams.setdefault(trigram, []).append(ingredient_id)
+
+    def rank(self, ingredient_ids, limit):
+        return heapq.nsmallest(limit, ingredient_ids, key=lambda pk: (
+            -self.usage.get(pk, 0), self.items[pk]['name']
+        ))
+
+    def search(self, query, limit):
+        """
+        Ищет ингредиенты по началу, подстроке или похожему названию.
+
+        Args:
+            query (str): Введенная часть названия.
+            limit (int): Максимальное число результатов.
+
+        Returns:
+            list: Словари с полями id, name, measurement_unit.
+        """
+        query = query.strip().casefold()
+        if not query:
+            return []
+        start = bisect_left(self.keys, query)
+        end = bisect_left(self.keys, query + MAX_CHAR, start)
+        found = self.rank(self.ids[start:end], limit)
+        if len(found) < limit:
+            prefix = set(self.ids[start:end])
+            found += self.rank(
+                [
+                    ingredient_id
+                    for key, ingredient_id in zip(self.keys, self.ids)
+                    if query in key and ingredient_id not in prefix
+                ],
+                limit - len(found),
+            )
+        if not found:
+            found = self.similar(query, limit)
+        return [self.items[ingredient_id] for ingredient_id in found]
+
+    def similar(self, query, limit):
+        query_trigrams = trigrams(query)
+        matches = Counter()
+        for trigram in query_trigrams:
+            matches.update(self.trigrams.get(trigram, ()))
+        threshold = len(query_trigrams) * settings.INGREDIENT_SIMILARITY
+        return [
+            ingredient_id
+            for ingredient_id, _ in heapq.nlargest(
+                limit,
+                (item for item in matches.items() if item[1] >= threshold),
+                key=lambda item: (item[1], self.usage.get(item[0], 0)),
+            )
+        ]
+
+    @classmethod
+    def from_db(cls):
+        usage = dict(
+            IngredientsInRecipe.objects.values('ingredient').annotate(
+                recipes_count=Count('id')
+            ).order_by().values_list('ingredient', 'recipes_count')
+        )
+        return cls(reference.ingredients.get().items, usage)
+
+
+_index = None
+_index_version = None
+_index_built = 0
+_lock = threading.Lock()
+
+
+def get_index():
+    """
+    Возвращает индекс, перестраивая его после изменения ингредиентов.
+
+    Порядок по популярности обновляется не реже, чем раз в
+    INGREDIENT_INDEX_TTL секунд.
+    """
+    global _index, _index_version, _index_built
+    version = get_version('ingredients')
+    expired = time.monotonic() - _index_built > settings.INGREDIENT_INDEX_TTL
+    if _index is None or _index_version != version or expired:
+        with _lock:
+            if _index is None or _index_version != version or expired:
+                _index = IngredientIndex.from_db()
+                _index_version = version
+                _index_built = time.monotonic()
+    return _index
+
+
+def search_ingredients(query):
+    return get_index().search(query, settings.INGREDIENT_SEARCH_LIMIT)
@@ -0,0 +1,131 @@
+from django.db import connections, router, transaction
+from django.utils import timezone
+
+from recipes.signals import recipes_linked
+
+
+def get_connection(model):
+    return connections[router.db_for_write(model)]
+
+
+def quoted_names(model):
+    """
+    Имена таблицы и столбцов пользователя, рецепта и времени добавления
+    в кавычках.
+    """
+    quote = get_connection(model).ops.quote_name
+    opts = model._meta
+    return (
+        quote(opts.db_table),
+        quote(opts.get_field('user').column),
+        quote(opts.get_field('recipe').column),
+        quote(opts.get_field('added').column),
+    )
+
+
+def execute_returning(model, sql, params):
+    """
+    Выполняет запрос с RETURNING recipe_id, added.
+
+    Returns:
+        list: Пары (рецепт, время добавления).
+    """
+    connection = get_connection(model)
+    added = model._meta.get_field('added').get_col(model._meta.db_table)
+    converters = (
+        connection.ops.get_db_converters(added)
+        + added.get_db_converters(connection)
+    )
+    with connection.cursor() as cursor:
+        cursor.execute(sql, params)
+        rows = cursor.fetchall()
+    entries = []
+    for recipe_id, value in rows:
+        for converter in converters:
+            value = converter(value, added, connection)
+        entries.append((recipe_id, value))
+    return entries
+
+
+def send_linked(model, user_id, entries, delta):
+    """
+    Отправляет recipes_linked для строк, которые изменил запрос.
+
+    Счетчики, события рейтингов, множества членства и списки покупок
+    обновляет тот же подписчик, что и при сохранении одной записи, и
+    только для рецептов, которые действительно были добавлены или
+    удалены.
+
+    Returns:
+        list: Идентификаторы добавленных или удаленных рецептов.
+    """
+    if entries:
+        recipes_linked.send(
+            sender=model, user_id=user_id, entries=entries, delta=delta
+        )
+    return [recipe_id for recipe_id, _ in entries]
+
+
+@transaction.atomic
+def add_recipes(model, user, recipe_ids):
+    """
+    Добавляет рецепты в избранное или корзину одним INSERT.
+
+    Уже добавленные рецепты пропускаются (ON CONFLICT DO NOTHING), а
+    RETURNING сообщает, какие строки вставлены на самом деле, поэтому
+    повторный или параллельный запрос не меняет счетчики дважды.
+
+    Args:
+        model (Model): Favorite или ShoppingCart.
+        user (User): Пользователь.
+        recipe_ids (Iterable[int]): Идентификаторы существующих рецептов.
+
+    Returns:
+        list: Идентификаторы добавленных рецептов.
+    """
+    recipe_ids = list(dict.fromkeys(recipe_ids))
+    if not recipe_ids:
+        return []
+    table, user_column, recipe_column, added_column = quoted_names(model)
+    sql = (
+        f'INSERT INTO {table} ({user_column}, {recipe_column}, '
+        f'{added_column}) '
+        f'VALUES {", ".join(["(%s, %s, %s)"] * len(recipe_ids))} '
+        f'ON CONFLICT DO NOTHING RETURNING {recipe_column}, {added_column}'
+    )
+    added = get_connection(model).ops.adapt_datetimefield_value(
+        timezone.now()
+    )
+    params = [
+        value
+        for recipe_id in recipe_ids
+        for value in (user.id, recipe_id, added)
+    ]
+    entries = execute_returning(model, sql, params)
+    return send_linked(model, user.id, entries, 1)
+
+
+@transaction.atomic
+def remove_recipes(model, user, recipe_ids):
+    """
+    Удаляет рецепты из избранного или корзины одним DELETE ... IN.
+
+    Args:
+        model (Model): Favorite или ShoppingCart.
+        user (User): Пользователь.
+        recipe_ids (Iterable[int]): Идентификаторы рецептов.
+
+    Returns:
+        list: Идентификаторы удаленных рецептов.
+    """
+    recipe_ids = list(dict.fromkeys(recipe_ids))
+    if not recipe_ids:
+        return []
+    table, user_column, recipe_column, added_column = quoted_names(model)
+    sql = (
+        f'DELETE FROM {table} WHERE {user_column} = %s '
+        f'AND {recipe_column} IN ({", ".join(["%s"] * len(recipe_ids))}) '
+        f'RETURNING {recipe_column}, {added_column}'
+    )
+    entries = execute_returning(model, sql, [user.id, *recipe_ids])
+    return send_linked(model, user.id, entries, -1)
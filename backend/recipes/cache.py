@@ -0,0 +1,138 @@
+from django.conf import settings
+from django.core.cache import cache
+
+from recipes import membership
+from recipes.versions import bump_version, get_versions
+
+
+def recipe_cache_key(recipe_id, version):
+    return f'recipe:{recipe_id}:{version}'
+
+
+def recipe_version_scope(recipe_id):
+    return f'recipe:{recipe_id}'
+
+
+def get_recipe_payloads(recipe_ids):
+    """
+    Возвращает представления рецептов одним multi-get к кэшу.
+
+    Ключ включает метку версии рецепта, поэтому представление, собранное
+    до изменения рецепта и записанное в кэш после него, уже никто не
+    прочитает. Отсутствующие в кэше рецепты собираются из базы и
+    кладутся в кэш.
+
+    Args:
+        recipe_ids (Iterable[int]): Идентификаторы рецептов.
+
+    Returns:
+        dict: Представления рецептов по идентификатору.
+    """
+    scopes = {
+        recipe_version_scope(recipe_id): recipe_id for recipe_id in recipe_ids
+    }
+    versions = {
+        scopes[scope]: version
+        for scope, version in get_versions(*scopes).items()
+    }
+    keys = {
+        recipe_cache_key(recipe_id, version): recipe_id
+        for recipe_id, version in versions.items()
+    }
+    cached = cache.get_many(keys, version=settings.RECIPE_CACHE_VERSION)
+    payloads = {keys[key]: payload for key, payload in cached.items()}
+    missing = [
+        recipe_id for recipe_id in keys.values() if recipe_id not in payloads
+    ]
+    if missing:
+        from recipes.payloads import build_recipe_payloads
+
+        built = build_recipe_payloads(missing)
+        cache.set_many(
+            {recipe_cache_key(recipe_id, versions[recipe_id]): payload
+             for recipe_id, payload in built.items()},
+            timeout=settings.RECIPE_CACHE_TIMEOUT,
+            version=settings.RECIPE_CACHE_VERSION,
+        )
+        payloads.update(built)
+    return payloads
+
+
+def get_user_flags(user, payloads):
+    """
+    Получает флаги пользователя для набора рецептов из множеств членства.
+
+    Args:
+        user (User): Текущий пользователь.
+        payloads (dict): Представления рецептов по идентификатору.
+
+    Returns:
+        dict: Словари флагов по идентификатору рецепта.
+    """
+    if user.is_anonymous or not payloads:
+        return {}
+    favorites = membership.get_members(user, membership.FAVORITES)
+    shopping_cart = membership.get_members(user, membership.SHOPPING_CART)
+    follows = membership.get_members(user, membership.FOLLOWS)
+    return {
+        recipe_id: {
+            'is_favorited': recipe_id in favorites,
+            'is_in_shopping_cart': recipe_id in shopping_cart,
+            'author_is_subscribed': payload['author']['id'] in follows,
+        }
+        for recipe_id, payload in payloads.items()
+    }
+
+
+def render_recipes(recipe_ids, request):
+    """
+    Собирает ответ для списка рецептов из кэша и флагов пользователя.
+
+    Args:
+        recipe_ids (list): Идентификаторы рецептов в нужном порядке.
+        request (Request): Текущий запрос.
+
+    Returns:
+        list: Представления рецептов; удаленные рецепты пропускаются.
+    """
+    payloads = get_recipe_payloads(recipe_ids)
+    flags = get_user_flags(request.user, payloads)
+    data = []
+    for recipe_id in recipe_ids:
+        if recipe_id not in payloads:
+            continue
+        payload = dict(payloads[recipe_id])
+        payload['author'] = dict(payload['author'])
+        if payload['image']:
+            payload['image'] = request.build_absolute_uri(payload['image'])
+        payload['image_variants'] = {
+            name: request.build_absolute_uri(url)
+            for name, url in payload['image_variants'].items()
+        }
+        recipe_flags = flags.get(recipe_id)
+        if recipe_flags is not None:
+            payload['is_favorited'] = recipe_flags['is_favorited']
+            payload['is_in_shopping_cart'] = (
+                recipe_flags['is_in_shopping_cart']
+            )
+            payload['author']['is_subscribed'] = (
+                recipe_flags['author_is_subscribed']
+            )
+        data.append(payload)
+    return data
+
+
+def invalidate_recipes(recipe_ids):
+    """
+    Обновляет метки версий рецептов после фиксации транзакции.
+
+    Представления со старой меткой в ключе больше не читаются и
+    вытесняются из кэша по таймауту. Метки рецептов и списка рецептов
+    также используются для ETag и Last-Modified.
+
+    Args:
+        recipe_ids (Iterable[int]): Идентификаторы рецептов.
+    """
+    scopes = [recipe_version_scope(recipe_id) for recipe_id in recipe_ids]
+    if scopes:
+        bump_version('recipes', *scopes)
@@ -0,0 +1,31 @@
+from django.conf import settings
+from django.core.checks import Warning, register
+
+# Бэкенды кэша, данные которых видны только одному процессу
+PROCESS_LOCAL_CACHES = {
+    'django.core.cache.backends.locmem.LocMemCache',
+    'django.core.cache.backends.dummy.DummyCache',
+}
+
+
+@register()
+def check_shared_cache(app_configs, **kwargs):
+    """
+    Предупреждает, если кэш по умолчанию не общий для процессов.
+
+    Метки версий (ETag списков, рейтинги, похожие рецепты, справочники)
+    меняют команды update_recipe_scores, update_similar_recipes,
+    importcsvdata и другие воркеры gunicorn. С кэшем в памяти процесса
+    эти изменения не доходят до воркера, который отвечает на запрос.
+    """
+    backend = settings.CACHES['default']['BACKEND']
+    if backend not in PROCESS_LOCAL_CACHES:
+        return []
+    return [Warning(
+        'Кэш по умолчанию хранится в памяти процесса: метки версий, '
+        'измененные командами и другими воркерами, не будут видны.',
+        hint='Укажите общий бэкенд в CACHE_BACKEND, например '
+             'FileBasedCache или PyMemcacheCache.',
+        obj=backend,
+        id='recipes.W001',
+    )]
@@ -0,0 +1,75 @@
+from collections import Counter, defaultdict
+
+from django.db.models import Count, F, OuterRef, Subquery
+from django.db.models.functions import Coalesce, Greatest
+from users.models import Follow, User
+
+from recipes.models import Favorite, Recipe, ShoppingCart
+
+# Счетчик для каждой модели: модель счетчика, поле связи и поле счетчика
+COUNTERS = {
+    Favorite: (Recipe, 'recipe_id', 'favorites_count'),
+    ShoppingCart: (Recipe, 'recipe_id', 'in_carts_count'),
+    Follow: (User, 'author_id', 'followers_count'),
+    Recipe: (User, 'author_id', 'recipes_count'),
+}
+
+
+def change_counters(sender, object_ids, delta):
+    """
+    Изменяет счетчики на месте выражением F() без чтения значений.
+
+    Одинаковые идентификаторы суммируются, и на каждое встреченное
+    приращение выполняется один UPDATE, поэтому массовые операции
+    обходятся несколькими запросами.
+
+    Args:
+        sender (Model): Модель, в которой создаются или удаляются записи.
+        object_ids (Iterable[int]): Идентификаторы объектов со счетчиком,
+            по одному на каждую запись.
+        delta (int): 1 при создании записей, -1 при удалении.
+    """
+    model, _, field = COUNTERS[sender]
+    by_change = defaultdict(list)
+    for object_id, times in Counter(object_ids).items():
+        by_change[delta * times].append(object_id)
+    for change, ids in by_change.items():
+        model.objects.filter(id__in=ids).update(
+            **{field: Greatest(F(field) + change, 0)}
+        )
+
+
+def live_count(sender):
+    """
+    Подзапрос с фактическим числом записей для объекта со счетчиком.
+    """
+    _, link, _ = COUNTERS[sender]
+    return Coalesce(Subquery(
+        sender.objects.filter(**{link: OuterRef('pk')}).order_by().values(
+            link
+        ).annotate(total=Count('*')).values('total')
+    ), 0)
+
+
+def reconcile(check=False):
+    """
+    Сверяет счетчики с фактическими данными и исправляет расхождения.
+
+    Args:
+        check (bool): Только посчитать расхождения, не исправляя их.
+
+    Returns:
+        dict: Число расходящихся строк по имени счетчика.
+    """
+    drift = {}
+    for sender, (model, _, field) in COUNTERS.items():
+        stale = model.objects.annotate(live=live_count(sender)).exclude(
+            **{field: F('live')}
+        ).values_list('pk', flat=True)
+        if check:
+            drift[field] = stale.count()
+            continue
+        drift[field] = model.objects.filter(pk__in=list(stale)).update(
+            **{field: live_count(sender)}
+        )
+    return drift
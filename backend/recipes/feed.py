@@ -0,0 +1,130 @@
+import logging
+from itertools import islice
+
+from django.conf import settings
+from django.db import transaction
+from users.models import Follow
+
+from recipes.models import FeedEntry, Recipe
+from recipes.versions import bump_version
+
+logger = logging.getLogger(__name__)
+
+# Метка версии лент: меняется после рассылки рецепта по лентам, которая
+# идет уже после фиксации транзакции и сброса метки 'recipes'
+FEED_SCOPE = 'feed'
+
+
+def insert_entries(entries):
+    """
+    Вставляет записи ленты пачками, пропуская уже существующие.
+    """
+    entries = iter(entries)
+    while True:
+        batch = list(islice(entries, settings.FEED_BATCH_SIZE))
+        if not batch:
+            return
+        FeedEntry.objects.bulk_create(batch, ignore_conflicts=True)
+
+
+def fan_out(recipe_id, author_id, pub_date):
+    """
+    Добавляет новый рецепт в ленты всех подписчиков автора.
+
+    Записи вставляются пачками по FEED_BATCH_SIZE; повторный запуск
+    пропускает уже добавленные записи. После вставки меняется метка
+    FEED_SCOPE, чтобы ETag ленты учел новые записи.
+
+    Args:
+        recipe_id (int): Опубликованный рецепт.
+        author_id (int): Автор рецепта.
+        pub_date (datetime): Дата публикации.
+    """
+    followers = Follow.objects.filter(
+        author_id=author_id
+    ).values_list('user_id', flat=True)
+    insert_entries(
+        FeedEntry(
+            user_id=user_id,
+            recipe_id=recipe_id,
+            author_id=author_id,
+            pub_date=pub_date,
+        )
+        for user_id in followers.iterator()
+    )
+    bump_version(FEED_SCOPE)
+
+
+def fan_out_safely(recipe_id, author_id, pub_date):
+    try:
+        fan_out(recipe_id, author_id, pub_date)
+    except Exception:
+        logger.exception(
+            'Не удалось добавить рецепт %s в ленты подписчиков', recipe_id
+        )
+
+
+def schedule_fan_out(recipe):
+    """
+    Рассылает рецепт по лентам после фиксации транзакции.
+
+    Рассылка не удлиняет транзакцию создания рецепта и не отменяет ее
+    при ошибке; пропущенные записи восстанавливает команда rebuild_feed.
+
+    Args:
+        recipe (Recipe): Опубликованный рецепт.
+    """
+    recipe_id, author_id, pub_date = (
+        recipe.id, recipe.author_id, recipe.pub_date
+    )
+    transaction.on_commit(
+        lambda: fan_out_safely(recipe_id, author_id, pub_date)
+    )
+
+
+def backfill(user_id, author_id, limit=None):
+    """
+    Добавляет в ленту пользователя последние рецепты автора.
+
+    Args:
+        user_id (int): Подписчик.
+        author_id (int): Автор, на которого оформлена подписка.
+        limit (int): Число рецептов, по умолчанию FEED_BACKFILL_LIMIT.
+    """
+    recipes = Recipe.objects.filter(author_id=author_id).order_by(
+        '-pub_date', '-id'
+    ).values_list('id', 'pub_date')[:limit or settings.FEED_BACKFILL_LIMIT]
+    insert_entries(
+        FeedEntry(
+            user_id=user_id,
+            recipe_id=recipe_id,
+            author_id=author_id,
+            pub_date=pub_date,
+        )
+        for recipe_id, pub_date in recipes
+    )
+
+
+def prune(user_id, author_id):
+    """
+    Удаляет из ленты пользователя рецепты автора после отписки.
+    """
+    FeedEntry.objects.filter(user_id=user_id, author_id=author_id).delete()
+
+
+@transaction.atomic
+def rebuild(limit=None):
+    """
+    Заполняет ленты заново по текущим подпискам.
+
+    Returns:
+        int: Число обработанных подписок.
+    """
+    FeedEntry.objects.all().delete()
+    follows = Follow.objects.values_list('user_id', 'author_id')
+    count = 0
+    for user_id, author_id in follows.iterator():
+        backfill(user_id, author_id, limit)
+        count += 1
+    bump_version(FEED_SCOPE)
+    return count
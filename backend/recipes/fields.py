@@ -0,0 +1,99 @@
+from django.core.exceptions import ValidationError as DjangoValidationError
+from rest_framework import serializers
+from rest_framework.relations import MANY_RELATION_KWARGS, ManyRelatedField
+
+from recipes.images import variant_urls
+
+DOES_NOT_EXIST = 'Объекты с первичными ключами {pk_values} не существуют.'
+
+
+def resolve_primary_keys(queryset, pks):
+    """
+    Разрешает первичные ключи в объекты одним запросом.
+
+    Args:
+        queryset (QuerySet): Набор, в котором ищутся объекты.
+        pks (list): Первичные ключи в порядке передачи.
+
+    Returns:
+        list: Объекты в порядке переданных ключей.
+
+    Raises:
+        ValidationError: Если часть объектов не найдена; в сообщении
+            перечисляются все отсутствующие ключи.
+    """
+    objects = queryset.in_bulk(pks)
+    missing = [pk for pk in pks if pk not in objects]
+    if missing:
+        raise serializers.ValidationError(
+            DOES_NOT_EXIST.format(pk_values=', '.join(map(str, missing))),
+            code='does_not_exist',
+        )
+    return [objects[pk] for pk in pks]
+
+
+class BulkManyRelatedField(ManyRelatedField):
+    """
+    Список связанных объектов, который проверяется одним запросом.
+
+    Ключи сначала приводятся к типу без обращения к базе, повторы
+    отбрасываются, затем все объекты загружаются через in_bulk.
+    """
+
+    def to_internal_value(self, data):
+        if isinstance(data, str) or not hasattr(data, '__iter__'):
+            self.fail('not_a_list', input_type=type(data).__name__)
+        if not self.allow_empty and len(data) == 0:
+            self.fail('empty')
+        pks = list(dict.fromkeys(
+            self.child_relation.to_primary_key(item) for item in data
+        ))
+        return resolve_primary_keys(self.child_relation.get_queryset(), pks)
+
+
+class BulkPrimaryKeyRelatedField(serializers.PrimaryKeyRelatedField):
+    """
+    Поле первичного ключа, которое при many=True разрешает все ключи
+    одним запросом вместо запроса на каждый элемент.
+    """
+
+    @classmethod
+    def many_init(cls, *args, **kwargs):
+        list_kwargs = {'child_relation': cls(*args, **kwargs)}
+        for key in kwargs:
+            if key in MANY_RELATION_KWARGS:
+                list_kwargs[key] = kwargs[key]
+        return BulkManyRelatedField(**list_kwargs)
+
+    def to_primary_key(self, data):
+        """
+        Приводит ключ к типу поля модели без запроса к базе.
+        """
+        if isinstance(data, bool):
+            self.fail('incorrect_type', data_type=type(data).__name__)
+        if self.pk_field is not None:
+            return self.pk_field.to_internal_value(data)
+        try:
+            return self.get_queryset().model._meta.pk.to_python(data)
+        except (TypeError, ValueError, DjangoValidationError):
+            self.fail('incorrect_type', data_type=type(data).__name__)
+
+
+class ImageVariantsField(serializers.ReadOnlyField):
+    """
+    Ссылки на варианты изображения рецепта по имени варианта.
+    """
+
+    def __init__(self, **kwargs):
+        kwargs['source'] = '*'
+        super().__init__(**kwargs)
+
+    def to_representation(self, recipe):
+        urls = variant_urls(recipe)
+        request = self.context.get('request')
+        if request is None:
+            return urls
+        return {
+            name: request.build_absolute_uri(url)
+            for name, url in urls.items()
+        }
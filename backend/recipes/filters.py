@@ -1,8 +1,13 @@
+from django.conf import settings
+from django.db.models import Exists, OuterRef
 from django_filters.rest_framework import FilterSet, filters
-from tags.models import Tag
+from rest_framework.filters import BaseFilterBackend
 from users.models import User
 
+from recipes import membership, reference
 from recipes.models import Ingredient, Recipe
+from recipes.ranking import get_ordering
+from recipes.search import search_recipes
 
 
 class IngredientFilter(FilterSet):
@@ -18,13 +23,85 @@ class IngredientFilter(FilterSet):
         model = Ingredient
         fields = ('name',)
 
+def tag_choices():
+    return [
+        (tag.slug, tag.name) for tag in reference.tags.get().objects.values()
+    ]
+
+
+def filter_by_tags(queryset, slugs):
+    """
+    Рецепты хотя бы с одним из тегов, без повторов строк.
+
+    Слаги переводятся в идентификаторы по справочнику в памяти, а
+    условие проверяется подзапросом EXISTS по индексу таблицы связи
+    (recipe_id, tag_id), поэтому соединения и DISTINCT не нужны.
+
+    Args:
+        queryset (QuerySet): Набор рецептов.
+        slugs (Iterable[str]): Слаги тегов.
+
+    Returns:
+        QuerySet: Отфильтрованный набор рецептов.
+    """
+    tags = reference.tags.get().objects.values()
+    slugs = set(slugs)
+    tag_ids = [tag.id for tag in tags if tag.slug in slugs]
+    return queryset.filter(Exists(Recipe.tags.through.objects.filter(
+        recipe_id=OuterRef('pk'), tag_id__in=tag_ids
+    )))
+
+
+def filter_by_members(queryset, user, kind):
+    """
+    Рецепты из множества членства пользователя (избранное или корзина).
+
+    Небольшое множество подставляется в запрос списком идентификаторов,
+    чтобы не обращаться к таблице связи. Для множеств больше
+    MEMBERSHIP_FILTER_MAX_IDS используется подзапрос EXISTS по индексу
+    (user_id, recipe_id), а не список литералов неограниченной длины.
+
+    Args:
+        queryset (QuerySet): Набор рецептов.
+        user (User): Авторизованный пользователь.
+        kind (str): membership.FAVORITES или membership.SHOPPING_CART.
+
+    Returns:
+        QuerySet: Отфильтрованный набор рецептов.
+    """
+    members = membership.get_members(user, kind)
+    if len(members) <= settings.MEMBERSHIP_FILTER_MAX_IDS:
+        return queryset.filter(id__in=members)
+    model, _ = membership.SOURCES[kind]
+    return queryset.filter(Exists(model.objects.filter(
+        user_id=user.id, recipe_id=OuterRef('pk')
+    )))
+
+
+class TagSlugFilter(filters.MultipleChoiceFilter):
+    """
+    Фильтр по слагам тегов (?tags=a&tags=b) через filter_by_tags.
+
+    Допустимые слаги берутся из справочника тегов в памяти.
+    """
+
+    def __init__(self, *args, **kwargs):
+        kwargs.setdefault('choices', tag_choices)
+        super().__init__(*args, **kwargs)
+
+    def filter(self, qs, value):
+        if not value:
+            return qs
+        return filter_by_tags(qs, value)
+
+
 class TagFilter(FilterSet):
     """
     Фильтр для модели Recipe с использованием тегов.
 
     Атрибуты:
         author (ModelChoiceFilter): Фильтр по автору рецепта.
-        tags (ModelMultipleChoiceFilter): Фильтр по тегам рецепта.
+        tags (TagSlugFilter): Фильтр по тегам рецепта.
         is_favorited (BooleanFilter): Фильтр по избранным рецептам.
         is_in_shopping_cart (BooleanFilter): Фильтр по рецептам в корзине.
 
@@ -36,11 +113,7 @@ class TagFilter(FilterSet):
             Получает рецепты, которые пользователь добавил в корзину.
     """
     author = filters.ModelChoiceFilter(queryset=User.objects.all())
-    tags = filters.ModelMultipleChoiceFilter(
-        field_name='tags__slug',
-        queryset=Tag.objects.all(),
-        to_field_name='slug',
-    )
+    tags = TagSlugFilter()
     is_favorited = filters.BooleanFilter(method='get_is_favorited')
     is_in_shopping_cart = filters.BooleanFilter(
         method='get_is_in_shopping_cart'
@@ -63,7 +136,9 @@ class TagFilter(FilterSet):
             QuerySet: Отфильтрованный набор запросов.
         """
         if self.request.user.is_authenticated and value is True:
-            return queryset.filter(users_favorites__user=self.request.user)
+            return filter_by_members(
+                queryset, self.request.user, membership.FAVORITES
+            )
         return queryset
 
     def get_is_in_shopping_cart(self, queryset, name, value):
@@ -79,5 +154,42 @@ class TagFilter(FilterSet):
             QuerySet: Отфильтрованный набор запросов.
         """
         if self.request.user.is_authenticated and value is True:
-            return queryset.filter(shopping_cart__user=self.request.user)
+            return filter_by_members(
+                queryset, self.request.user, membership.SHOPPING_CART
+            )
         return queryset
+
+
+class RecipeSearchFilter(BaseFilterBackend):
+    """
+    Полнотекстовый поиск рецептов по параметру ?search=.
+
+    Ищет по названию, описанию и названиям ингредиентов и сортирует
+    результаты по релевантности. Применяется вместе с TagFilter.
+
+    Атрибуты:
+        search_param (str): Имя параметра запроса.
+    """
+    search_param = 'search'
+
+    def filter_queryset(self, request, queryset, view):
+        query = request.query_params.get(self.search_param, '').strip()
+        if not query:
+            return queryset
+        return search_recipes(queryset, query)
+
+
+class RecipeOrderingFilter(BaseFilterBackend):
+    """
+    Сортировка рецептов по рейтингу: ?ordering=trending|popular.
+
+    Рейтинги хранятся в рецепте, поэтому список читается по индексу
+    (рейтинг, id). Без параметра или с неизвестным значением порядок
+    не меняется.
+    """
+
+    def filter_queryset(self, request, queryset, view):
+        ordering = get_ordering(request)
+        if ordering is None:
+            return queryset
+        return queryset.order_by(*ordering)
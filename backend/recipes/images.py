@@ -0,0 +1,175 @@
+import hashlib
+import logging
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from io import BytesIO
+
+from django.conf import settings
+from django.core.files.base import ContentFile
+from django.db import connections, transaction
+from PIL import Image, ImageOps
+
+from recipes.cache import invalidate_recipes
+from recipes.models import Recipe
+
+logger = logging.getLogger(__name__)
+
+# Ключ исходного файла в словаре вариантов
+ORIGINAL = 'original'
+
+_executor = None
+_executor_lock = threading.Lock()
+
+
+def get_executor():
+    global _executor
+    with _executor_lock:
+        if _executor is None:
+            _executor = ThreadPoolExecutor(
+                max_workers=settings.IMAGE_WORKERS,
+                thread_name_prefix='image-variants',
+            )
+    return _executor
+
+
+def render_variant(image, size):
+    """
+    Уменьшает изображение до заданных границ и перекодирует его.
+
+    Args:
+        image (Image): Исходное изображение.
+        size (tuple): Максимальные ширина и высота.
+
+    Returns:
+        bytes: Содержимое файла варианта.
+    """
+    variant = image.copy()
+    variant.thumbnail(size, Image.LANCZOS)
+    if variant.mode not in ('RGB', 'L'):
+        background = Image.new('RGB', variant.size, (255, 255, 255))
+        variant = variant.convert('RGBA')
+        background.paste(variant, mask=variant.getchannel('A'))
+        variant = background
+    buffer = BytesIO()
+    variant.save(
+        buffer,
+        settings.IMAGE_VARIANT_FORMAT,
+        quality=settings.IMAGE_VARIANT_QUALITY,
+        optimize=True,
+    )
+    return buffer.getvalue()
+
+
+def save_variant(storage, stem, name, content):
+    """
+    Сохраняет вариант под именем с хэшем содержимого.
+
+    Имя меняется вместе с содержимым, поэтому файлы можно отдавать
+    с бессрочным кэшированием; одинаковый вариант не пишется дважды.
+    """
+    digest = hashlib.sha256(content).hexdigest()[:16]
+    extension = settings.IMAGE_VARIANT_FORMAT.lower()
+    path = f'{settings.IMAGE_VARIANT_DIR}{stem}.{name}.{digest}.{extension}'
+    if not storage.exists(path):
+        path = storage.save(path, ContentFile(content))
+    return path
+
+
+def build_variants(recipe_id, force=False):
+    """
+    Строит варианты изображения рецепта и сохраняет их пути.
+
+    Args:
+        recipe_id (int): Идентификатор рецепта.
+        force (bool): Перестроить варианты, даже если они актуальны.
+
+    Returns:
+        bool: True, если варианты были построены.
+    """
+    recipe = Recipe.objects.filter(id=recipe_id).only(
+        'id', 'image', 'image_variants'
+    ).first()
+    if recipe is None or not recipe.image:
+        return False
+    source = recipe.image.name
+    if not force and recipe.image_variants.get(ORIGINAL) == source:
+        return False
+    storage = recipe.image.storage
+    with storage.open(source, 'rb') as file:
+        image = ImageOps.exif_transpose(Image.open(file))
+        image.load()
+    stem = os.path.splitext(os.path.basename(source))[0]
+    variants = {ORIGINAL: source}
+    for name, size in settings.IMAGE_VARIANTS.items():
+        variants[name] = save_variant(
+            storage, stem, name, render_variant(image, size)
+        )
+    # Изображение могло смениться, пока строились варианты
+    updated = Recipe.objects.filter(id=recipe_id, image=source).update(
+        image_variants=variants
+    )
+    if updated:
+        invalidate_recipes([recipe_id])
+    return bool(updated)
+
+
+def build_variants_safely(recipe_id):
+    try:
+        build_variants(recipe_id)
+    except Exception:
+        logger.exception(
+            'Не удалось построить варианты изображения рецепта %s', recipe_id
+        )
+
+
+def build_variants_in_worker(recipe_id):
+    """
+    Строит варианты в потоке пула и закрывает его соединения с базой.
+    """
+    try:
+        build_variants_safely(recipe_id)
+    finally:
+        connections.close_all()
+
+
+def schedule_variants(recipe_id):
+    """
+    Ставит построение вариантов в пул после фиксации транзакции.
+    """
+    if not settings.IMAGE_WORKERS:
+        transaction.on_commit(lambda: build_variants_safely(recipe_id))
+        return
+    transaction.on_commit(
+        lambda: get_executor().submit(build_variants_in_worker, recipe_id)
+    )
+
+
+def variant_urls(recipe):
+    """
+    Возвращает ссылки на варианты изображения рецепта.
+
+    Пока варианты не построены для текущего файла, в словаре есть
+    только исходное изображение.
+
+    Args:
+        recipe (Recipe): Рецепт.
+
+    Returns:
+        dict: Ссылки по имени варианта.
+    """
+    return build_variant_urls(
+        recipe.image.storage, recipe.image.name, recipe.image_variants
+    )
+
+
+def build_variant_urls(storage, image, variants):
+    """
+    Ссылки на варианты по имени файла изображения и словарю путей.
+    """
+    if not image:
+        return {}
+    variants = variants or {}
+    if variants.get(ORIGINAL) != image:
+        return {ORIGINAL: storage.url(image)}
+    return {name: storage.url(path) for name, path in variants.items()}
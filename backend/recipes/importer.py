@@ -0,0 +1,244 @@
+import csv
+import json
+import logging
+import time
+from dataclasses import dataclass, field
+
+from django.core.exceptions import ValidationError
+from django.db import transaction
+from django.db.models import Q
+from tags.models import Tag
+
+from recipes.models import Ingredient
+from recipes.versions import bump_version
+
+logger = logging.getLogger(__name__)
+
+FORMATS = ('csv', 'json', 'ndjson')
+
+
+@dataclass(frozen=True)
+class ImportSpec:
+    """
+    Описание импортируемой модели.
+
+    Атрибуты:
+        model (Model): Модель справочника.
+        fields (tuple): Поля в порядке колонок CSV.
+        unique (tuple): Наборы полей, уникальные в базе.
+        version_scope (str): Метка версии, которую нужно обновить.
+    """
+    model: type
+    fields: tuple
+    unique: tuple
+    version_scope: str
+
+
+SPECS = {
+    'ingredients': ImportSpec(
+        Ingredient,
+        fields=('name', 'measurement_unit'),
+        unique=(('name', 'measurement_unit'),),
+        version_scope='ingredients',
+    ),
+    'tags': ImportSpec(
+        Tag,
+        fields=('name', 'color', 'slug'),
+        unique=(('name',), ('color',), ('slug',)),
+        version_scope='tags',
+    ),
+}
+
+
+@dataclass
+class ImportStats:
+    read: int = 0
+    inserted: int = 0
+    invalid: int = 0
+    duplicates: int = 0
+    conflicts: int = 0
+    started: float = field(default_factory=time.monotonic)
+
+    @property
+    def rows_per_second(self):
+        elapsed = time.monotonic() - self.started
+        return self.read / elapsed if elapsed else float(self.read)
+
+    def __str__(self):
+        return (
+            f'read {self.read}, inserted {self.inserted}, '
+            f'skipped {self.invalid} invalid and {self.duplicates} '
+            f'duplicate, {self.conflicts} already in the database '
+            f'({self.rows_per_second:.0f} rows/sec)'
+        )
+
+
+def read_csv(file, fields):
+    for row in csv.reader(file):
+        if row:
+            yield dict(zip(fields, row))
+
+
+def read_ndjson(file, fields):
+    for line in file:
+        if line.strip():
+            yield json.loads(line)
+
+
+def read_json(file, fields, chunk_size=64 * 1024):
+    """
+    Потоково читает элементы JSON-массива, не загружая файл целиком.
+    """
+    decoder = json.JSONDecoder()
+    buffer = file.read(chunk_size).lstrip()
+    if not buffer.startswith('['):
+        raise ValueError('Ожидается JSON-массив')
+    buffer = buffer[1:]
+    while True:
+        buffer = buffer.lstrip().lstrip(',').lstrip()
+        if buffer.startswith(']'):
+            return
+        try:
+            item, end = decoder.raw_decode(buffer)
+        except json.JSONDecodeError:
+            chunk = file.read(chunk_size)
+            if not chunk:
+                raise
+            buffer += chunk
+            continue
+        yield item
+        buffer = buffer[end:]
+
+
+READERS = {'csv': read_csv, 'json': read_json, 'ndjson': read_ndjson}
+
+
+class BulkImporter:
+    """
+    Пакетный идемпотентный импорт справочника.
+
+    Строки проверяются валидаторами полей модели и дедуплицируются в
+    памяти по уникальным полям. Каждый пакет сверяется с базой одним
+    запросом и записывается одним bulk_create(ignore_conflicts=True).
+
+    Атрибуты:
+        spec (ImportSpec): Описание импортируемой модели.
+        batch_size (int): Размер пакета записи.
+        stats (ImportStats): Счетчики импорта.
+    """
+
+    def __init__(self, spec, batch_size=5000):
+        self.spec = spec
+        self.batch_size = batch_size
+        self.stats = ImportStats()
+        self.seen = [set() for _ in spec.unique]
+        self.fields = [
+            spec.model._meta.get_field(name) for name in spec.fields
+        ]
+
+    def clean(self, row):
+        cleaned = {}
+        for model_field in self.fields:
+            value = str(row.get(model_field.name) or '').strip()
+            if not value:
+                raise ValidationError(f'Пустое поле {model_field.name}')
+            model_field.run_validators(value)
+            cleaned[model_field.name] = value
+        return cleaned
+
+    def keys(self, row):
+        return [
+            tuple(row[name] for name in unique) for unique in self.spec.unique
+        ]
+
+    def is_duplicate(self, row):
+        hashes = [hash(key) for key in self.keys(row)]
+        if any(key in seen for key, seen in zip(hashes, self.seen)):
+            return True
+        for key, seen in zip(hashes, self.seen):
+            seen.add(key)
+        return False
+
+    def existing_keys(self, batch):
+        condition = Q()
+        for unique in self.spec.unique:
+            condition |= Q(**{
+                f'{unique[0]}__in': {row[unique[0]] for row in batch}
+            })
+        existing = [set() for _ in self.spec.unique]
+        for values in self.spec.model.objects.filter(condition).values(
+            *self.spec.fields
+        ):
+            for keys, key in zip(existing, self.keys(values)):
+                keys.add(key)
+        return existing
+
+    def write(self, batch):
+        existing = self.existing_keys(batch)
+        new = [
+            row for row in batch
+            if not any(
+                key in keys for key, keys in zip(self.keys(row), existing)
+            )
+        ]
+        self.stats.conflicts += len(batch) - len(new)
+        self.spec.model.objects.bulk_create(
+            [self.spec.model(**row) for row in new], ignore_conflicts=True
+        )
+        self.stats.inserted += len(new)
+
+    def run(self, rows):
+        """
+        Импортирует строки в одной транзакции.
+
+        Args:
+            rows (Iterable[dict]): Строки со значениями полей.
+
+        Returns:
+            ImportStats: Счетчики импорта.
+        """
+        batch = []
+        with transaction.atomic():
+            for row in rows:
+                self.stats.read += 1
+                try:
+                    row = self.clean(row)
+                except ValidationError:
+                    self.stats.invalid += 1
+                    continue
+                if self.is_duplicate(row):
+                    self.stats.duplicates += 1
+                    continue
+                batch.append(row)
+                if len(batch) >= self.batch_size:
+                    self.write(batch)
+                    batch = []
+            if batch:
+                self.write(batch)
+            bump_version(self.spec.version_scope)
+        logger.info('Imported %s: %s', self.spec.model.__name__, self.stats)
+        return self.stats
+
+
+def detect_format(path):
+    extension = path.rsplit('.', 1)[-1].lower()
+    return extension if extension in FORMATS else 'csv'
+
+
+def import_file(kind, path, file_format=None, batch_size=5000):
+    """
+    Импортирует файл справочника.
+
+    Args:
+        kind (str): 'ingredients' или 'tags'.
+        path (str): Путь к файлу.
+        file_format (str): csv, json или ndjson; по умолчанию по расширению.
+        batch_size (int): Размер пакета записи.
+
+    Returns:
+        ImportStats: Счетчики импорта.
+    """
+    spec = SPECS[kind]
+    reader = READERS[file_format or detect_format(path)]
+    with open(path, newline='', encoding='utf8') as file:
+        return BulkImporter(spec, batch_size).run(reader(file, spec.fields))
@@ -0,0 +1,67 @@
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+from rest_framework.renderers import JSONRenderer
+
+from recipes.models import Recipe
+from recipes.payloads import build_recipe_payloads, serialize_recipe_payloads
+
+
+class Command(BaseCommand):
+    help = (
+        'Check that the fast recipe payload builder renders the same JSON '
+        'as RecipeSerializer and compare their speed'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--recipes',
+            type=int,
+            default=100,
+            help='Number of newest recipes to build',
+        )
+        parser.add_argument(
+            '--repeat',
+            type=int,
+            default=5,
+            help='Timed runs per builder; the best run is reported',
+        )
+
+    def measure(self, build, recipe_ids, repeat):
+        best = None
+        for _ in range(repeat):
+            start = time.perf_counter()
+            payloads = build(recipe_ids)
+            elapsed = time.perf_counter() - start
+            best = elapsed if best is None else min(best, elapsed)
+        return payloads, best
+
+    def handle(self, *args, **options):
+        recipe_ids = list(Recipe.objects.values_list(
+            'id', flat=True
+        )[:options['recipes']])
+        if not recipe_ids:
+            raise CommandError('Нет рецептов для сравнения')
+        renderer = JSONRenderer()
+        expected, slow = self.measure(
+            serialize_recipe_payloads, recipe_ids, options['repeat']
+        )
+        actual, fast = self.measure(
+            build_recipe_payloads, recipe_ids, options['repeat']
+        )
+        mismatched = [
+            recipe_id for recipe_id in recipe_ids
+            if renderer.render(expected.get(recipe_id))
+            != renderer.render(actual.get(recipe_id))
+        ]
+        per_hundred = 100 / len(recipe_ids) * 1000
+        self.stdout.write(
+            f'{len(recipe_ids)} recipes: serializer '
+            f'{slow * per_hundred:.1f} ms/100, builder '
+            f'{fast * per_hundred:.1f} ms/100 ({slow / fast:.1f}x)'
+        )
+        if mismatched:
+            raise CommandError(
+                f'Представления различаются для рецептов: {mismatched[:20]}'
+            )
+        self.stdout.write(self.style.SUCCESS('Payloads are byte-identical'))
@@ -0,0 +1,82 @@
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db.models import Count
+
+from recipes import reference
+from recipes.filters import filter_by_tags
+from recipes.models import Recipe
+from recipes.pagination import CustomPagination
+
+
+class Command(BaseCommand):
+    help = (
+        'Compare the EXISTS tag filter with the join it replaced on 1, 3 '
+        'and all tags: result correctness and timings'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--repeat',
+            type=int,
+            default=5,
+            help='Timed runs per query; the best run is reported',
+        )
+
+    def measure(self, queryset, repeat):
+        """
+        Лучшее время первой страницы и подсчета строк, в миллисекундах.
+        """
+        page_size = CustomPagination.page_size
+        best = None
+        for _ in range(repeat):
+            start = time.perf_counter()
+            page = list(queryset.order_by('-pub_date', '-id').values_list(
+                'id', flat=True
+            )[:page_size])
+            count = queryset.count()
+            elapsed = time.perf_counter() - start
+            best = elapsed if best is None else min(best, elapsed)
+        return page, count, best * 1000
+
+    def get_cases(self):
+        popular = list(Recipe.tags.through.objects.values('tag_id').annotate(
+            recipes=Count('id')
+        ).order_by('-recipes').values_list('tag_id', flat=True))
+        tags = reference.tags.get().objects
+        slugs = [tags[tag_id].slug for tag_id in popular if tag_id in tags]
+        if not slugs:
+            raise CommandError('Нет рецептов с тегами для сравнения')
+        return (
+            ('1 tag', slugs[:1]),
+            ('3 tags', slugs[:3]),
+            ('all tags', slugs),
+        )
+
+    def handle(self, *args, **options):
+        repeat = options['repeat']
+        recipes = Recipe.objects.all()
+        failed = []
+        for label, slugs in self.get_cases():
+            joined = recipes.filter(tags__slug__in=slugs)
+            _, join_count, join_time = self.measure(joined, repeat)
+            expected, count, distinct_time = self.measure(
+                joined.distinct(), repeat
+            )
+            page, exists_count, exists_time = self.measure(
+                filter_by_tags(recipes, slugs), repeat
+            )
+            self.stdout.write(
+                f'{label}: join {join_time:.1f} ms ({join_count} rows), '
+                f'distinct {distinct_time:.1f} ms, '
+                f'exists {exists_time:.1f} ms ({exists_count} rows)'
+            )
+            if (page, exists_count) != (expected, count):
+                failed.append(label)
+        if failed:
+            raise CommandError(
+                f'Результаты EXISTS и DISTINCT различаются: {failed}'
+            )
+        self.stdout.write(self.style.SUCCESS(
+            'EXISTS results match DISTINCT with no duplicate rows'
+        ))
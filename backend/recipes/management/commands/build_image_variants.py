@@ -0,0 +1,42 @@
+from concurrent.futures import ThreadPoolExecutor
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.db import connections
+
+from recipes.images import build_variants
+from recipes.models import Recipe
+
+
+class Command(BaseCommand):
+    help = 'Build resized image variants for existing recipes'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--force',
+            action='store_true',
+            help='Rebuild variants that are already up to date',
+        )
+
+    def handle(self, *args, **options):
+        force = options['force']
+        failed = []
+
+        def build(recipe_id):
+            try:
+                return build_variants(recipe_id, force=force)
+            except Exception as error:
+                failed.append(recipe_id)
+                self.stderr.write(f'Recipe {recipe_id}: {error}')
+                return False
+            finally:
+                connections.close_all()
+
+        recipe_ids = Recipe.objects.exclude(image='').values_list(
+            'id', flat=True
+        ).order_by('id')
+        with ThreadPoolExecutor(settings.IMAGE_WORKERS or 1) as pool:
+            built = sum(pool.map(build, recipe_ids.iterator()))
+        self.stdout.write(self.style.SUCCESS(
+            f'Built variants for {built} recipes, {len(failed)} failed'
+        ))
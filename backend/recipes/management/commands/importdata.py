@@ -0,0 +1,38 @@
+import os
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+from recipes.importer import FORMATS, SPECS, import_file
+
+DATA_ROOT = os.path.join(settings.BASE_DIR, 'data')
+
+DEFAULT_FILES = {
+    'ingredients': 'ingredients.csv',
+    'tags': 'tags.csv',
+}
+
+
+class Command(BaseCommand):
+    help = 'Bulk load reference data from csv, json or ndjson into the database'
+
+    def add_arguments(self, parser):
+        parser.add_argument('kind', choices=sorted(SPECS))
+        parser.add_argument('filename', nargs='?', type=str)
+        parser.add_argument('--format', choices=FORMATS)
+        parser.add_argument('--batch-size', type=int, default=5000)
+
+    def handle(self, *args, **options):
+        kind = options['kind']
+        path = os.path.join(
+            DATA_ROOT, options['filename'] or DEFAULT_FILES[kind]
+        )
+        try:
+            stats = import_file(
+                kind, path, options['format'], options['batch_size']
+            )
+        except FileNotFoundError:
+            raise CommandError(f'Добавьте файл {kind} в директорию data')
+        except ValueError as error:
+            raise CommandError(f'Не удалось прочитать {path}: {error}')
+        self.stdout.write(self.style.SUCCESS(f'{kind}: {stats}'))
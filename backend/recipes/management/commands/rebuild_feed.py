@@ -0,0 +1,21 @@
+from django.core.management.base import BaseCommand
+
+from recipes.feed import rebuild
+
+
+class Command(BaseCommand):
+    help = 'Rebuild subscription feeds from current follows'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--limit',
+            type=int,
+            default=None,
+            help='Latest recipes per followed author (FEED_BACKFILL_LIMIT)',
+        )
+
+    def handle(self, *args, **options):
+        count = rebuild(options['limit'])
+        self.stdout.write(self.style.SUCCESS(
+            f'Rebuilt feeds for {count} follows'
+        ))
@@ -0,0 +1,32 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from recipes import shopping_list
+
+
+class Command(BaseCommand):
+    help = 'Rebuild shopping list totals and verify them against the carts'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--check',
+            action='store_true',
+            help='Only compare stored totals with the live aggregate',
+        )
+
+    def handle(self, *args, **options):
+        if not options['check']:
+            created = shopping_list.rebuild()
+            self.stdout.write(f'Rebuilt {created} shopping list rows')
+        live = shopping_list.get_live_totals()
+        stored = shopping_list.get_stored_totals()
+        drift = {
+            key for key in {*live, *stored}
+            if live.get(key) != stored.get(key)
+        }
+        if drift:
+            raise CommandError(
+                f'Расхождение в {len(drift)} строках списков покупок'
+            )
+        self.stdout.write(self.style.SUCCESS(
+            f'Shopping list totals match the carts ({len(live)} rows)'
+        ))
@@ -0,0 +1,24 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from recipes import counters
+
+
+class Command(BaseCommand):
+    help = 'Repair drift in recipe and user counters'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--check',
+            action='store_true',
+            help='Only report counters that differ from the live data',
+        )
+
+    def handle(self, *args, **options):
+        drift = counters.reconcile(check=options['check'])
+        for field, rows in drift.items():
+            self.stdout.write(f'{field}: {rows} rows')
+        if options['check'] and any(drift.values()):
+            raise CommandError(
+                f'Расхождение счетчиков в {sum(drift.values())} строках'
+            )
+        self.stdout.write(self.style.SUCCESS('Counters match the live data'))
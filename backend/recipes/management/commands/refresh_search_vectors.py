@@ -0,0 +1,24 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from recipes.search import backfill_search_vectors, use_postgres
+
+
+class Command(BaseCommand):
+    help = 'Fill full-text search vectors of recipes that have none'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--all',
+            action='store_true',
+            help='Recompute search vectors of every recipe',
+        )
+
+    def handle(self, *args, **options):
+        if not use_postgres():
+            raise CommandError(
+                'Поисковые векторы поддерживаются только в PostgreSQL'
+            )
+        updated = backfill_search_vectors(rebuild=options['all'])
+        self.stdout.write(self.style.SUCCESS(
+            f'Updated search vectors for {updated} recipes'
+        ))
@@ -0,0 +1,30 @@
+from django.core.management.base import BaseCommand
+
+from recipes.ranking import rebuild_popularity, update_scores
+
+
+class Command(BaseCommand):
+    help = 'Apply new favorite and cart events to recipe ranking scores'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=None,
+            help='Events per transaction (RANKING_BATCH_SIZE)',
+        )
+        parser.add_argument(
+            '--rebuild',
+            action='store_true',
+            help='Recompute popularity scores from the counters',
+        )
+
+    def handle(self, *args, **options):
+        if options['rebuild']:
+            rebuild_popularity()
+            self.stdout.write(self.style.SUCCESS('Rebuilt popularity scores'))
+            return
+        processed = update_scores(options['batch_size'])
+        self.stdout.write(self.style.SUCCESS(
+            f'Processed {processed} events'
+        ))
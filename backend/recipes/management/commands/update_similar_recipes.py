@@ -0,0 +1,20 @@
+from django.core.management.base import BaseCommand
+
+from recipes.similarity import update_similar
+
+
+class Command(BaseCommand):
+    help = 'Recompute similar recipes for recipes whose ingredients changed'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--all',
+            action='store_true',
+            help='Recompute similar recipes for every recipe',
+        )
+
+    def handle(self, *args, **options):
+        updated = update_similar(rebuild=options['all'])
+        self.stdout.write(self.style.SUCCESS(
+            f'Updated similar recipes for {updated} recipes'
+        ))
@@ -0,0 +1,164 @@
+import threading
+from collections import OrderedDict
+
+from django.conf import settings
+from django.core.cache import cache
+from django.utils.module_loading import import_string
+from users.models import Follow
+
+from recipes.models import Favorite, ShoppingCart
+from recipes.versions import bump_version, get_version
+
+FAVORITES = 'favorites'
+SHOPPING_CART = 'shopping_cart'
+FOLLOWS = 'follows'
+
+# Источник множества: модель связи и поле с идентификатором объекта
+SOURCES = {
+    FAVORITES: (Favorite, 'recipe_id'),
+    SHOPPING_CART: (ShoppingCart, 'recipe_id'),
+    FOLLOWS: (Follow, 'author_id'),
+}
+
+
+class LocalMembershipBackend:
+    """
+    Хранилище множеств в памяти процесса с вытеснением по LRU.
+
+    Метка версии в get и set не используется: множества процесса
+    обновляются на месте методом update.
+
+    Атрибуты:
+        max_entries (int): Максимальное число хранимых множеств.
+    """
+
+    def __init__(self, max_entries):
+        self.max_entries = max_entries
+        self._sets = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, user_id, kind, version):
+        with self._lock:
+            members = self._sets.get((user_id, kind))
+            if members is not None:
+                self._sets.move_to_end((user_id, kind))
+            return members
+
+    def set(self, user_id, kind, version, members):
+        with self._lock:
+            self._sets[(user_id, kind)] = members
+            self._sets.move_to_end((user_id, kind))
+            while len(self._sets) > self.max_entries:
+                self._sets.popitem(last=False)
+
+    def update(self, user_id, kind, added=(), removed=()):
+        with self._lock:
+            members = self._sets.get((user_id, kind))
+            if members is not None:
+                self._sets[(user_id, kind)] = (
+                    members | frozenset(added)
+                ) - frozenset(removed)
+
+
+class CacheMembershipBackend:
+    """
+    Хранилище множеств в кэше Django, общее для всех воркеров.
+
+    Ключ включает метку версии множеств пользователя, которую
+    update_members обновляет после фиксации записи. Множество, прочитанное
+    из базы до фиксации и записанное в кэш позже, остается под старым
+    ключом и больше не читается.
+    """
+
+    def __init__(self, max_entries):
+        self.max_entries = max_entries
+
+    def key(self, user_id, kind, version):
+        return f'membership:{kind}:{user_id}:{version}'
+
+    def get(self, user_id, kind, version):
+        return cache.get(self.key(user_id, kind, version))
+
+    def set(self, user_id, kind, version, members):
+        cache.set(
+            self.key(user_id, kind, version),
+            members,
+            timeout=settings.MEMBERSHIP_CACHE_TIMEOUT,
+        )
+
+    def update(self, user_id, kind, added=(), removed=()):
+        # Старые множества вытесняет обновление метки версии
+        pass
+
+
+_backend = None
+
+
+def get_backend():
+    global _backend
+    if _backend is None:
+        _backend = import_string(settings.MEMBERSHIP_BACKEND)(
+            settings.MEMBERSHIP_MAX_ENTRIES
+        )
+    return _backend
+
+
+def reset_backend():
+    """
+    Сбрасывает хранилище, например между тестами.
+    """
+    global _backend
+    _backend = None
+
+
+def get_members(user, kind):
+    """
+    Возвращает множество идентификаторов, связанных с пользователем.
+
+    Метка версии читается до загрузки из базы, поэтому множество,
+    загруженное до фиксации записи, сохраняется под устаревшей меткой.
+
+    Args:
+        user (User): Пользователь (может быть анонимным).
+        kind (str): FAVORITES, SHOPPING_CART или FOLLOWS.
+
+    Returns:
+        frozenset: Идентификаторы рецептов или авторов.
+    """
+    if user is None or user.is_anonymous:
+        return frozenset()
+    backend = get_backend()
+    version = get_version(version_scope(user.id))
+    members = backend.get(user.id, kind, version)
+    if members is None:
+        model, field = SOURCES[kind]
+        members = frozenset(
+            model.objects.filter(user_id=user.id).values_list(field, flat=True)
+        )
+        backend.set(user.id, kind, version, members)
+    return members
+
+
+def is_member(user, kind, object_id):
+    return object_id in get_members(user, kind)
+
+
+def version_scope(user_id):
+    """
+    Имя метки версии множеств пользователя (для условных запросов).
+    """
+    return f'membership:{user_id}'
+
+
+def update_members(user_id, kind, added=(), removed=()):
+    """
+    Обновляет загруженное множество пользователя при записи.
+
+    Args:
+        user_id (int): Идентификатор пользователя.
+        kind (str): FAVORITES, SHOPPING_CART или FOLLOWS.
+        added (Iterable[int]): Добавленные идентификаторы.
+        removed (Iterable[int]): Удаленные идентификаторы.
+    """
+    get_backend().update(user_id, kind, added, removed)
+    bump_version(version_scope(user_id))
@@ -1,4 +1,14 @@
+import hashlib
+
+from django.core.exceptions import ImproperlyConfigured
+from django.utils.cache import (get_conditional_response, patch_vary_headers,
+                                quote_etag)
+from django.utils.http import http_date
 from rest_framework import mixins, viewsets
+from rest_framework.response import Response
+
+from recipes import membership
+from recipes.versions import get_versions
 
 
 class ListCreateRetrieveMixins(
@@ -15,4 +25,152 @@ class RetrieveListMixins(
     mixins.RetrieveModelMixin,
     viewsets.GenericViewSet
 ):
-    pass
\ No newline at end of file
+    pass
+
+
+class KeysetPaginationMixin:
+    """
+    Включает keyset-пагинацию, если в запросе передан параметр курсора.
+
+    Клиент запрашивает первую страницу с пустым курсором (?cursor=),
+    дальше переходит по ссылкам next/previous из ответа. Без курсора
+    используется обычный pagination_class.
+
+    Атрибуты:
+        keyset_pagination_class (type): Класс keyset-пагинации.
+    """
+    keyset_pagination_class = None
+
+    @property
+    def paginator(self):
+        pagination_class = self.keyset_pagination_class
+        if (
+            not hasattr(self, '_paginator')
+            and pagination_class is not None
+            and pagination_class.cursor_query_param in self.request.query_params
+        ):
+            self._paginator = pagination_class()
+        return super().paginator
+
+
+class NotModified(Exception):
+    """
+    Прерывает обработку запроса готовым ответом 304.
+    """
+
+    def __init__(self, response):
+        super().__init__()
+        self.response = response
+
+
+class ConditionalGetMixin:
+    """
+    Условные GET-запросы (ETag и Last-Modified) по меткам версий данных.
+
+    Валидаторы вычисляются из меток get_version_scopes() до выборки и
+    сериализации; если клиент прислал совпадающий If-None-Match или
+    If-Modified-Since, сразу возвращается 304.
+
+    Подкласс обязан задать version_scopes или переопределить
+    get_version_scopes(); иначе при объявлении класса возникает
+    ImproperlyConfigured.
+
+    Атрибуты:
+        version_scopes (tuple): Имена меток версий, от которых зависит
+            ответ.
+        conditional_actions (tuple): Действия с условными ответами.
+        per_user (bool): Ответ зависит от пользователя (флаги избранного,
+            корзины и подписки); в валидатор входят пользователь и метка
+            его множеств.
+    """
+    version_scopes = ()
+    conditional_actions = ('list', 'retrieve')
+    per_user = False
+    validators = None
+
+    def __init_subclass__(cls, **kwargs):
+        super().__init_subclass__(**kwargs)
+        if (
+            not cls.version_scopes
+            and cls.get_version_scopes is ConditionalGetMixin.get_version_scopes
+        ):
+            raise ImproperlyConfigured(
+                f'{cls.__name__} должен задать version_scopes '
+                f'или переопределить get_version_scopes()'
+            )
+
+    def get_version_scopes(self):
+        """
+        Имена меток версий, от которых зависит ответ.
+        """
+        return self.version_scopes
+
+    def get_validators(self, request):
+        scopes = list(self.get_version_scopes())
+        user_id = None
+        if self.per_user and request.user.is_authenticated:
+            user_id = request.user.id
+            scopes.append(membership.version_scope(user_id))
+        versions = get_versions(*scopes)
+        source = repr((
+            request.get_full_path(),
+            request.accepted_renderer.format,
+            user_id,
+            sorted(versions.items()),
+        ))
+        etag = quote_etag(hashlib.sha1(source.encode()).hexdigest())
+        last_modified = max(versions.values()) // 10 ** 9
+        return etag, last_modified
+
+    def initial(self, request, *args, **kwargs):
+        super().initial(request, *args, **kwargs)
+        if (
+            request.method not in ('GET', 'HEAD')
+            or self.action not in self.conditional_actions
+        ):
+            return
+        self.validators = self.get_validators(request)
+        etag, last_modified = self.validators
+        response = get_conditional_response(
+            request, etag=etag, last_modified=last_modified
+        )
+        if response is not None:
+            raise NotModified(response)
+
+    def handle_exception(self, exc):
+        if isinstance(exc, NotModified):
+            return exc.response
+        return super().handle_exception(exc)
+
+    def finalize_response(self, request, response, *args, **kwargs):
+        response = super().finalize_response(
+            request, response, *args, **kwargs
+        )
+        if self.validators and response.status_code in (200, 304):
+            etag, last_modified = self.validators
+            response['ETag'] = etag
+            response['Last-Modified'] = http_date(last_modified)
+            if self.per_user:
+                patch_vary_headers(response, ('Authorization',))
+        return response
+
+
+class ReferenceDataMixin:
+    """
+    Отдает список и объекты справочника из памяти процесса без запросов.
+
+    Если объекта нет в снимке, запрос обрабатывается обычным образом.
+
+    Атрибуты:
+        reference (ReferenceRegistry): Справочник из recipes.reference.
+    """
+    reference = None
+
+    def list(self, request, *args, **kwargs):
+        return Response(self.reference.get().items)
+
+    def retrieve(self, request, *args, **kwargs):
+        data = self.reference.get().get(kwargs[self.lookup_field])
+        if data is None:
+            return super().retrieve(request, *args, **kwargs)
+        return Response(data)
@@ -1,8 +1,12 @@
 from django.conf import settings
+from django.contrib.postgres.search import SearchVectorField
 from django.core.validators import MaxValueValidator, MinValueValidator
 from django.db import models
+from django.utils import timezone
 from tags.models import Tag
-from users.models import User
+from users.models import EditableFieldsSaveMixin, User
+
+from recipes.storage import ContentAddressedStorage
 
 
 class Ingredient(models.Model):
@@ -40,7 +44,74 @@ class Ingredient(models.Model):
     def __str__(self):
         return self.name
 
-class Recipe(models.Model):
+class RecipeQuerySet(models.QuerySet):
+    """
+    QuerySet рецептов для пакетной выборки связанных данных.
+
+    Методы:
+        with_related(): Подгружает автора, теги и ингредиенты.
+        without_user_flags(): Аннотирует флаги пользователя значением False.
+        latest_per_author(limit): Оставляет последние рецепты каждого автора.
+    """
+
+    def with_related(self):
+        """
+        Подгружает связанные данные фиксированным числом запросов.
+
+        Названия ингредиентов берутся из справочника в памяти, поэтому
+        из базы читаются только строки связи с количеством.
+
+        Returns:
+            QuerySet: Рецепты с автором, тегами и ингредиентами.
+        """
+        return self.select_related('author').prefetch_related(
+            models.Prefetch('tags', queryset=Tag.objects.order_by('id')),
+            models.Prefetch(
+                'ingredient_in_recipe',
+                queryset=IngredientsInRecipe.objects.order_by('id')
+            ),
+        )
+
+    def without_user_flags(self):
+        """
+        Аннотирует флаги пользователя значением False.
+
+        Представления рецептов в кэше не зависят от пользователя: флаги
+        подставляются при ответе из множеств членства.
+
+        Returns:
+            QuerySet: Рецепты с полями is_favorited, is_in_shopping_cart
+            и author_is_subscribed.
+        """
+        false = models.Value(False, output_field=models.BooleanField())
+        return self.annotate(
+            is_favorited=false,
+            is_in_shopping_cart=false,
+            author_is_subscribed=false,
+        )
+
+    def latest_per_author(self, limit):
+        """
+        Оставляет не более limit последних рецептов каждого автора.
+
+        Ограничение задается коррелированным подзапросом с LIMIT, поэтому
+        рецепты любого числа авторов выбираются одним запросом.
+
+        Args:
+            limit (int): Число рецептов на автора.
+
+        Returns:
+            QuerySet: Рецепты, новые первыми.
+        """
+        latest = self.model.objects.filter(
+            author=models.OuterRef('author')
+        ).order_by('-pub_date', '-id').values('id')[:limit]
+        return self.filter(
+            id__in=models.Subquery(latest)
+        ).order_by('-pub_date', '-id')
+
+
+class Recipe(EditableFieldsSaveMixin, models.Model):
     """
     Модель для представления рецепта блюда.
 
@@ -53,6 +124,10 @@ class Recipe(models.Model):
         ingredients (ManyToManyField): Ингредиенты, связанные с рецептом.
         cooking_time (PositiveSmallIntegerField): Время приготовления.
         pub_date (DateTimeField): Дата публикации рецепта.
+        search_vector (SearchVectorField): Поисковый вектор (PostgreSQL).
+        image_variants (JSONField): Пути к уменьшенным копиям изображения.
+        favorites_count (PositiveIntegerField): Сколько раз рецепт добавлен в избранное.
+        in_carts_count (PositiveIntegerField): Сколько раз рецепт добавлен в корзину.
     """
 
     name = models.CharField(
@@ -70,6 +145,7 @@ class Recipe(models.Model):
     )
     image = models.ImageField(
         upload_to='recipes/',
+        storage=ContentAddressedStorage(),
         verbose_name='Изображение',
         help_text='Загрузите изображение блюда'
     )
@@ -107,9 +183,62 @@ class Recipe(models.Model):
         auto_now_add=True,
         db_index=True
     )
+    search_vector = SearchVectorField(
+        null=True,
+        editable=False,
+        verbose_name='Поисковый вектор'
+    )
+    image_variants = models.JSONField(
+        default=dict,
+        blank=True,
+        editable=False,
+        verbose_name='Варианты изображения'
+    )
+    favorites_count = models.PositiveIntegerField(
+        default=0,
+        editable=False,
+        verbose_name='В избранном'
+    )
+    in_carts_count = models.PositiveIntegerField(
+        default=0,
+        editable=False,
+        verbose_name='В корзинах'
+    )
+    trending_score = models.FloatField(
+        default=0,
+        editable=False,
+        verbose_name='Рейтинг в трендах'
+    )
+    popularity_score = models.FloatField(
+        default=0,
+        editable=False,
+        verbose_name='Популярность'
+    )
+    similar_stale = models.BooleanField(
+        default=True,
+        db_index=True,
+        editable=False,
+        verbose_name='Похожие рецепты устарели'
+    )
+
+    objects = RecipeQuerySet.as_manager()
 
     class Meta:
         ordering = ('-pub_date',)
+        indexes = (
+            models.Index(
+                fields=('-pub_date', '-id'),
+                name='recipe_pub_date_id_idx',
+            ),
+            models.Index(
+                fields=('-trending_score', '-id'),
+                name='recipe_trending_id_idx',
+            ),
+            models.Index(
+                fields=('-popularity_score', '-id'),
+                name='recipe_popularity_id_idx',
+            ),
+        )
         verbose_name = 'Рецепт'
         verbose_name_plural = 'Рецепты'
 
@@ -170,6 +299,7 @@ class Favorite(models.Model):
     Атрибуты:
         user (ForeignKey): Пользователь, добавляющий в избранное.
         recipe (ForeignKey): Рецепт, добавленный в избранное.
+        added (DateTimeField): Время добавления.
     """
 
     user = models.ForeignKey(
@@ -186,6 +316,9 @@ class Favorite(models.Model):
         verbose_name='Избранные у пользователей',
         help_text='Избранные рецепты у пользователей'
     )
+    added = models.DateTimeField(
+        'Добавлено', default=timezone.now, editable=False
+    )
 
     class Meta:
         constraints = (
@@ -207,6 +340,7 @@ class ShoppingCart(models.Model):
     Атрибуты:
         user (ForeignKey): Пользователь, которому принадлежит список покупок.
         recipe (ForeignKey): Рецепт, добавленный в список покупок.
+        added (DateTimeField): Время добавления.
 
     Метаданные:
         constraints (tuple): Уникальное ограничение, чтобы предотвратить дублирование записей.
@@ -226,6 +360,9 @@ class ShoppingCart(models.Model):
         related_name='shopping_cart',
         verbose_name='В списке у пользователей'
     )
+    added = models.DateTimeField(
+        'Добавлено', default=timezone.now, editable=False
+    )
 
     class Meta:
         constraints = (
@@ -239,3 +376,247 @@ class ShoppingCart(models.Model):
 
     def __str__(self):
         return f'{self.user} добавил {self.recipe} в список покупок'
+
+
+class RecipeEvent(models.Model):
+    """
+    Событие вовлеченности: рецепт добавлен или удален из избранного
+    или корзины.
+
+    Журнал разбирается командой update_recipe_scores, которая переносит
+    новые события в рейтинги рецептов и удаляет их. Ограничения внешнего
+    ключа нет: при удалении рецепта каскадно удаляется избранное, и его
+    события пишутся уже после удаления самого рецепта.
+
+    Вес события в трендах считается по времени добавления, и у удаления
+    оно то же, что у соответствующего добавления: удаление отменяет
+    ровно тот вклад, который внесло добавление.
+
+    Атрибуты:
+        recipe (ForeignKey): Рецепт.
+        kind (CharField): Избранное или корзина.
+        delta (SmallIntegerField): 1 при добавлении, -1 при удалении.
+        added (DateTimeField): Время добавления рецепта в избранное
+            или корзину.
+    """
+    FAVORITE = 'favorite'
+    SHOPPING_CART = 'shopping_cart'
+    KINDS = (
+        (FAVORITE, 'Избранное'),
+        (SHOPPING_CART, 'Список покупок'),
+    )
+
+    recipe = models.ForeignKey(
+        Recipe,
+        on_delete=models.DO_NOTHING,
+        db_constraint=False,
+        related_name='+',
+        verbose_name='Рецепт'
+    )
+    kind = models.CharField('Тип', max_length=16, choices=KINDS)
+    delta = models.SmallIntegerField('Изменение')
+    added = models.DateTimeField('Время добавления')
+
+    class Meta:
+        verbose_name = 'Событие рецепта'
+        verbose_name_plural = 'События рецептов'
+
+    def __str__(self):
+        return f'{self.recipe_id}: {self.kind} {self.delta:+d}'
+
+
+class RankingState(models.Model):
+    """
+    Состояние рейтингов рецептов (одна строка).
+
+    Вклад события в тренды растет как 2 ** ((t - trending_epoch) /
+    TRENDING_HALF_LIFE). Чтобы множители не росли без ограничений,
+    точка отсчета периодически переносится вперед, а рейтинги трендов
+    умножаются на соответствующий коэффициент.
+
+    Атрибуты:
+        trending_epoch (FloatField): Точка отсчета трендов (Unix time).
+    """
+    trending_epoch = models.FloatField('Точка отсчета трендов')
+
+    class Meta:
+        verbose_name = 'Состояние рейтингов'
+        verbose_name_plural = 'Состояние рейтингов'
+
+    def __str__(self):
+        return f'Тренды с {self.trending_epoch}'
+
+
+class RecipeSimilarity(models.Model):
+    """
+    Похожий рецепт из заранее рассчитанного списка соседей.
+
+    Для каждого рецепта хранятся SIMILAR_RECIPES_COUNT ближайших по
+    составу ингредиентов и тегам; списки пересчитывает команда
+    update_similar_recipes.
+
+    Атрибуты:
+        recipe (ForeignKey): Рецепт.
+        similar (ForeignKey): Похожий рецепт.
+        score (FloatField): Сходство от 0 до 1 с учетом тегов.
+    """
+    recipe = models.ForeignKey(
+        Recipe,
+        on_delete=models.CASCADE,
+        related_name='similar_recipes',
+        verbose_name='Рецепт'
+    )
+    similar = models.ForeignKey(
+        Recipe,
+        on_delete=models.CASCADE,
+        related_name='+',
+        verbose_name='Похожий рецепт'
+    )
+    score = models.FloatField('Сходство')
+
+    class Meta:
+        constraints = (
+            models.UniqueConstraint(
+                fields=('recipe', 'similar'),
+                name='unique_recipe_similarity'
+            ),
+        )
+        indexes = (
+            models.Index(
+                fields=('recipe', '-score'),
+                name='similarity_recipe_score_idx',
+            ),
+        )
+        verbose_name = 'Похожий рецепт'
+        verbose_name_plural = 'Похожие рецепты'
+
+    def __str__(self):
+        return f'{self.recipe_id} ~ {self.similar_id}: {self.score:.2f}'
+
+
+class IngredientsChange(models.Model):
+    """
+    Журнал изменений состава рецептов для индекса продуктов в памяти.
+
+    Воркеры перечитывают ингредиенты только рецептов из журнала, а не
+    всю таблицу; старые записи удаляются при полной перестройке индекса.
+    Ограничения внешнего ключа нет: удаление рецепта тоже записывается.
+
+    Атрибуты:
+        recipe (ForeignKey): Рецепт с измененным составом.
+        created (DateTimeField): Время изменения.
+    """
+    recipe = models.ForeignKey(
+        Recipe,
+        on_delete=models.DO_NOTHING,
+        db_constraint=False,
+        related_name='+',
+        verbose_name='Рецепт'
+    )
+    created = models.DateTimeField('Время', auto_now_add=True, db_index=True)
+
+    class Meta:
+        verbose_name = 'Изменение состава'
+        verbose_name_plural = 'Изменения состава'
+
+    def __str__(self):
+        return f'{self.recipe_id}: {self.created}'
+
+
+class ShoppingListItem(models.Model):
+    """
+    Модель для хранения суммарного количества ингредиента в списке покупок.
+
+    Строки поддерживаются при добавлении и удалении рецептов из корзины
+    и при изменении ингредиентов рецепта, который лежит в корзине.
+
+    Атрибуты:
+        user (ForeignKey): Пользователь, которому принадлежит список покупок.
+        ingredient (ForeignKey): Ингредиент из списка покупок.
+        total (IntegerField): Суммарное количество по всем рецептам корзины.
+    """
+    user = models.ForeignKey(
+        User,
+        on_delete=models.CASCADE,
+        related_name='shopping_list',
+        verbose_name='Пользователь'
+    )
+    ingredient = models.ForeignKey(
+        Ingredient,
+        on_delete=models.CASCADE,
+        related_name='shopping_list_items',
+        verbose_name='Ингредиент'
+    )
+    total = models.IntegerField('Количество')
+
+    class Meta:
+        constraints = (
+            models.UniqueConstraint(
+                fields=('user', 'ingredient'),
+                name='unique_shopping_list_item'
+            ),
+        )
+        verbose_name = 'Позиция списка покупок'
+        verbose_name_plural = 'Позиции списков покупок'
+
+    def __str__(self):
+        return f'{self.ingredient} - {self.total}'
+
+
+class FeedEntry(models.Model):
+    """
+    Запись ленты подписок: рецепт автора, на которого подписан пользователь.
+
+    Записи создаются при публикации рецепта (для всех подписчиков автора)
+    и при подписке (последние рецепты автора), удаляются при отписке.
+    Дата публикации и автор копируются из рецепта, чтобы лента читалась
+    по одному индексу без соединения с рецептами.
+
+    Атрибуты:
+        user (ForeignKey): Владелец ленты.
+        recipe (ForeignKey): Рецепт в ленте.
+        author (ForeignKey): Автор рецепта.
+        pub_date (DateTimeField): Дата публикации рецепта.
+    """
+    user = models.ForeignKey(
+        User,
+        on_delete=models.CASCADE,
+        related_name='feed',
+        verbose_name='Пользователь'
+    )
+    recipe = models.ForeignKey(
+        Recipe,
+        on_delete=models.CASCADE,
+        related_name='feed_entries',
+        verbose_name='Рецепт'
+    )
+    author = models.ForeignKey(
+        User,
+        on_delete=models.CASCADE,
+        related_name='+',
+        verbose_name='Автор'
+    )
+    pub_date = models.DateTimeField('Дата публикации')
+
+    class Meta:
+        constraints = (
+            models.UniqueConstraint(
+                fields=('user', 'recipe'),
+                name='unique_feed_entry'
+            ),
+        )
+        indexes = (
+            models.Index(
+                fields=('user', '-pub_date', '-recipe'),
+                name='feed_user_pub_date_idx',
+            ),
+            models.Index(
+                fields=('user', 'author'),
+                name='feed_user_author_idx',
+            ),
+        )
+        verbose_name = 'Запись ленты'
+        verbose_name_plural = 'Записи ленты'
+
+    def __str__(self):
+        return f'{self.recipe} в ленте {self.user}'
@@ -1,6 +1,216 @@
-from rest_framework.pagination import PageNumberPagination
+import base64
+import binascii
+import json
+
+from django.conf import settings
+from django.core.exceptions import ValidationError
+from django.core.paginator import Paginator
+from django.db import connections
+from django.db.models import Q
+from django.utils.functional import cached_property
+from rest_framework.exceptions import NotFound, ParseError
+from rest_framework.pagination import BasePagination, PageNumberPagination
+from rest_framework.response import Response
+from rest_framework.utils.urls import replace_query_param
+
+from recipes.filters import RecipeSearchFilter
+from recipes.ranking import get_ordering
 
 
 class CustomPagination(PageNumberPagination):
     page_size = 6
     page_size_query_param = 'limit'
+    max_page_size = 100
+
+
+class KeysetPagination(BasePagination):
+    """
+    Пагинация по ключу сортировки (keyset) с непрозрачным курсором.
+
+    Вместо OFFSET и COUNT(*) следующая страница выбирается условием
+    "строго после последней строки" по полям ordering, поэтому время
+    ответа не зависит от глубины прокрутки.
+
+    Атрибуты:
+        ordering (tuple): Поля сортировки, последнее должно быть уникальным.
+        cursor_query_param (str): Параметр запроса с курсором.
+        page_size (int): Размер страницы по умолчанию.
+        page_size_query_param (str): Параметр запроса с размером страницы.
+        max_page_size (int): Максимальный размер страницы.
+    """
+    ordering = None
+    cursor_query_param = 'cursor'
+    page_size = 6
+    page_size_query_param = 'limit'
+    max_page_size = 50
+    invalid_cursor_message = 'Неверный курсор'
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.request = request
+        self.base_url = request.build_absolute_uri()
+        page_size = self.get_page_size(request)
+        reverse, values = self.decode_cursor(request)
+
+        ordering = self.get_ordering(reverse)
+        queryset = queryset.order_by(*(
+            f'-{field}' if descending else field
+            for field, descending in ordering
+        ))
+        if values is not None:
+            try:
+                queryset = queryset.filter(
+                    self.get_keyset_filter(ordering, values)
+                )
+            except (TypeError, ValueError, ValidationError):
+                raise NotFound(self.invalid_cursor_message)
+        results = list(queryset[:page_size + 1])
+        has_more = len(results) > page_size
+        results = results[:page_size]
+        if reverse:
+            results.reverse()
+            self.has_next, self.has_previous = True, has_more
+        else:
+            self.has_next, self.has_previous = has_more, values is not None
+        self.page = results
+        return results
+
+    def get_paginated_response(self, data):
+        return Response({
+            'next': self.get_next_link(),
+            'previous': self.get_previous_link(),
+            'results': data,
+        })
+
+    def get_page_size(self, request):
+        try:
+            page_size = int(request.query_params[self.page_size_query_param])
+        except (KeyError, ValueError):
+            return self.page_size
+        if page_size <= 0:
+            return self.page_size
+        return min(page_size, self.max_page_size)
+
+    def get_ordering(self, reverse=False):
+        """
+        Возвращает пары (поле, по убыванию) с учетом направления курсора.
+        """
+        return [
+            (field.lstrip('-'), field.startswith('-') != reverse)
+            for field in self.ordering
+        ]
+
+    def get_keyset_filter(self, ordering, values):
+        """
+        Строит условие (a, b) < (x, y) в виде a < x OR (a = x AND b < y).
+        """
+        condition = None
+        for (field, descending), value in reversed(list(zip(ordering, values))):
+            lookup = 'lt' if descending else 'gt'
+            strict = Q(**{f'{field}__{lookup}': value})
+            if condition is None:
+                condition = strict
+            else:
+                condition = strict | (Q(**{field: value}) & condition)
+        return condition
+
+    def decode_cursor(self, request):
+        encoded = request.query_params.get(self.cursor_query_param)
+        if not encoded:
+            return False, None
+        try:
+            reverse, values = json.loads(
+                base64.urlsafe_b64decode(encoded.encode('ascii'))
+            )
+        except (TypeError, ValueError, UnicodeError, binascii.Error):
+            raise NotFound(self.invalid_cursor_message)
+        if not isinstance(values, list) or len(values) != len(self.ordering):
+            raise NotFound(self.invalid_cursor_message)
+        return bool(reverse), values
+
+    def encode_cursor(self, row, reverse):
+        values = []
+        for field, _ in self.get_ordering():
+            value = getattr(row, field)
+            values.append(
+                value.isoformat() if hasattr(value, 'isoformat') else value
+            )
+        encoded = base64.urlsafe_b64encode(
+            json.dumps([reverse, values]).encode('ascii')
+        ).decode('ascii')
+        return replace_query_param(
+            self.base_url, self.cursor_query_param, encoded
+        )
+
+    def get_next_link(self):
+        if not self.has_next or not self.page:
+            return None
+        return self.encode_cursor(self.page[-1], reverse=False)
+
+    def get_previous_link(self):
+        if not self.has_previous or not self.page:
+            return None
+        return self.encode_cursor(self.page[0], reverse=True)
+
+
+class RecipeKeysetPagination(KeysetPagination):
+    """
+    Keyset-пагинация рецептов по дате или по рейтингу из ?ordering=.
+
+    Результаты поиска упорядочены по релевантности, которой нет среди
+    ключей курсора, поэтому вместе с ?search= курсор не принимается.
+    """
+    ordering = ('-pub_date', '-id')
+    search_with_cursor_message = (
+        'Курсор нельзя использовать вместе с поиском: результаты поиска '
+        'упорядочены по релевантности'
+    )
+
+    def paginate_queryset(self, queryset, request, view=None):
+        search_param = RecipeSearchFilter.search_param
+        if request.query_params.get(search_param, '').strip():
+            raise ParseError(self.search_with_cursor_message)
+        self.ordering = get_ordering(request) or self.ordering
+        return super().paginate_queryset(queryset, request, view)
+
+
+class FeedKeysetPagination(KeysetPagination):
+    ordering = ('-pub_date', '-recipe_id')
+
+
+class FollowKeysetPagination(KeysetPagination):
+    ordering = ('author_id',)
+
+
+class EstimatedCountPaginator(Paginator):
+    """
+    Пагинатор админки, который не считает строки больших таблиц.
+
+    Для списка без фильтров на PostgreSQL число строк берется из
+    статистики планировщика (pg_class.reltuples), если оно больше
+    ADMIN_ESTIMATED_COUNT_THRESHOLD; иначе выполняется обычный COUNT(*).
+    """
+
+    @cached_property
+    def count(self):
+        queryset = self.object_list
+        if hasattr(queryset, 'query') and not queryset.query.where:
+            estimate = estimate_count(queryset)
+            if estimate > settings.ADMIN_ESTIMATED_COUNT_THRESHOLD:
+                return estimate
+        return super().count
+
+
+def estimate_count(queryset):
+    """
+    Оценка числа строк таблицы модели; 0, если оценки нет.
+    """
+    connection = connections[queryset.db]
+    if connection.vendor != 'postgresql':
+        return 0
+    with connection.cursor() as cursor:
+        cursor.execute(
+            'SELECT reltuples FROM pg_class WHERE oid = %s::regclass',
+            (queryset.model._meta.db_table,)
+        )
+        row = cursor.fetchone()
+    return max(int(row[0]), 0) if row else 0
@@ -0,0 +1,276 @@
+import heapq
+import threading
+import time
+from array import array
+from bisect import bisect_left, insort
+from collections import Counter, defaultdict
+from dataclasses import dataclass
+from datetime import timedelta
+from itertools import compress
+from operator import neg, sub
+
+from django.conf import settings
+from django.utils import timezone
+
+from recipes import reference
+from recipes.models import IngredientsChange, IngredientsInRecipe
+from recipes.versions import bump_version, get_version
+
+# Метка версии журнала изменений состава рецептов
+PANTRY_SCOPE = 'pantry'
+
+
+def recipes_changed(recipe_ids):
+    """
+    Записывает изменение состава рецептов в журнал для воркеров.
+    """
+    recipe_ids = set(recipe_ids)
+    if not recipe_ids:
+        return
+    IngredientsChange.objects.bulk_create([
+        IngredientsChange(recipe_id=recipe_id) for recipe_id in recipe_ids
+    ])
+    bump_version(PANTRY_SCOPE)
+
+
+@dataclass(frozen=True)
+class PantrySnapshot:
+    """
+    Согласованное состояние индекса продуктов.
+
+    Атрибуты:
+        postings (dict): Массивы идентификаторов рецептов по ингредиенту.
+        recipes (dict): Кортежи ингредиентов по рецепту.
+        sizes (dict): Число ингредиентов рецепта.
+    """
+    postings: dict
+    recipes: dict
+    sizes: dict
+
+
+class PantryIndex:
+    """
+    Обратный индекс ингредиент -> рецепты для подбора по продуктам.
+
+    Для каждого ингредиента хранится отсортированный массив рецептов,
+    для каждого рецепта - его ингредиенты. Покрытие считается проходом
+    по массивам переданных продуктов: рецепты без общих ингредиентов
+    не рассматриваются.
+
+    Атрибуты:
+        snapshot (PantrySnapshot): Текущее состояние; заменяется целиком.
+    """
+
+    def __init__(self, rows):
+        recipes = defaultdict(list)
+        postings = defaultdict(list)
+        for recipe_id, ingredient_id in rows:
+            recipes[recipe_id].append(ingredient_id)
+            postings[ingredient_id].append(recipe_id)
+        recipes = {
+            recipe_id: tuple(ingredient_ids)
+            for recipe_id, ingredient_ids in recipes.items()
+        }
+        self.snapshot = PantrySnapshot(
+            postings={
+                ingredient_id: array('q', sorted(recipe_ids))
+                for ingredient_id, recipe_ids in postings.items()
+            },
+            recipes=recipes,
+            sizes={
+                recipe_id: len(ingredient_ids)
+                for recipe_id, ingredient_ids in recipes.items()
+            },
+        )
+
+    @classmethod
+    def from_db(cls):
+        return cls(IngredientsInRecipe.objects.values_list(
+            'recipe_id', 'ingredient_id'
+        ).iterator())
+
+    def diff(self, recipe_ids, recipes):
+        """
+        Рецепты, которые нужно убрать из массивов и добавить в массивы.
+
+        Returns:
+            dict: Пары множеств (удалить, добавить) по ингредиенту.
+        """
+        changes = defaultdict(lambda: (set(), set()))
+        for recipe_id in recipe_ids:
+            old = set(self.snapshot.recipes.get(recipe_id, ()))
+            new = set(recipes.get(recipe_id, ()))
+            for ingredient_id in old - new:
+                changes[ingredient_id][0].add(recipe_id)
+            for ingredient_id in new - old:
+                changes[ingredient_id][1].add(recipe_id)
+        return changes
+
+    def update(self, recipe_ids, rows):
+        """
+        Заменяет состав рецептов; рецепты без строк удаляются.
+
+        Изменения вносятся в копии словарей, затронутые массивы строятся
+        заново, и новое состояние публикуется одним присваиванием
+        snapshot. Параллельный match() работает с тем состоянием, которое
+        прочитал в начале, и видит его целиком старым или целиком новым.
+
+        Args:
+            recipe_ids (set): Рецепты, состав которых перечитан.
+            rows (Iterable): Пары (рецепт, ингредиент) этих рецептов.
+        """
+        recipes = defaultdict(list)
+        for recipe_id, ingredient_id in rows:
+            recipes[recipe_id].append(ingredient_id)
+        changes = self.diff(recipe_ids, recipes)
+        snapshot = PantrySnapshot(
+            postings=dict(self.snapshot.postings),
+            recipes=dict(self.snapshot.recipes),
+            sizes=dict(self.snapshot.sizes),
+        )
+        for ingredient_id, (removed, added) in changes.items():
+            postings = array('q', snapshot.postings.get(ingredient_id, ()))
+            for recipe_id in removed:
+                del postings[bisect_left(postings, recipe_id)]
+            for recipe_id in added:
+                insort(postings, recipe_id)
+            if postings:
+                snapshot.postings[ingredient_id] = postings
+            else:
+                snapshot.postings.pop(ingredient_id, None)
+        for recipe_id in recipe_ids:
+            if recipe_id in recipes:
+                snapshot.recipes[recipe_id] = tuple(recipes[recipe_id])
+                snapshot.sizes[recipe_id] = len(recipes[recipe_id])
+            else:
+                snapshot.recipes.pop(recipe_id, None)
+                snapshot.sizes.pop(recipe_id, None)
+        self.snapshot = snapshot
+
+    def match(self, ingredient_ids, limit):
+        """
+        Рецепты по покрытию продуктами: сначала те, для которых есть
+        все ингредиенты, затем с наименьшим числом недостающих.
+
+        Args:
+            ingredient_ids (set): Имеющиеся продукты.
+            limit (int): Максимальное число рецептов.
+
+        Returns:
+            list: Пары (рецепт, недостающие ингредиенты).
+        """
+        snapshot = self.snapshot
+        hits = Counter()
+        for ingredient_id in ingredient_ids:
+            hits.update(snapshot.postings.get(ingredient_id, ()))
+        # Найденных рецептов могут быть десятки тысяч, поэтому вместо
+        # цикла на Python по ним всем число недостающих считается через
+        # map, по гистограмме находится порог для limit лучших, и
+        # сортируются только рецепты не хуже порога
+        recipe_ids = list(hits)
+        counts = list(hits.values())
+        missing = list(map(
+            sub, map(snapshot.sizes.__getitem__, recipe_ids), counts
+        ))
+        histogram = Counter(missing)
+        found = 0
+        for threshold in sorted(histogram):
+            found += histogram[threshold]
+            if found >= limit:
+                break
+        else:
+            threshold = None
+        if threshold is not None:
+            selected = list(map(threshold.__ge__, missing))
+            missing = compress(missing, selected)
+            counts = compress(counts, selected)
+            recipe_ids = compress(recipe_ids, selected)
+        ranked = heapq.nsmallest(limit, zip(
+            missing, map(neg, counts), map(neg, recipe_ids)
+        ))
+        return [
+            (-recipe_id, [
+                ingredient_id
+                for ingredient_id in snapshot.recipes[-recipe_id]
+                if ingredient_id not in ingredient_ids
+            ])
+            for _, _, recipe_id in ranked
+        ]
+
+
+_index = None
+_index_version = None
+_index_built = 0
+_changes_since = None
+_lock = threading.Lock()
+
+
+def rebuild():
+    """
+    Строит индекс заново и удаляет устаревшую часть журнала.
+    """
+    global _index, _index_built, _changes_since
+    since = timezone.now()
+    _index = PantryIndex.from_db()
+    _index_built = time.monotonic()
+    _changes_since = since - timedelta(seconds=settings.PANTRY_CHANGES_OVERLAP)
+    # Журнал старше срока хранения уже учтен всеми живыми индексами
+    IngredientsChange.objects.filter(created__lt=since - timedelta(
+        seconds=settings.PANTRY_CHANGES_RETENTION
+    )).delete()
+
+
+def apply_changes():
+    """
+    Перечитывает состав рецептов, измененных с прошлого обновления.
+    """
+    global _changes_since
+    since = timezone.now()
+    recipe_ids = set(IngredientsChange.objects.filter(
+        created__gte=_changes_since
+    ).values_list('recipe_id', flat=True))
+    if recipe_ids:
+        _index.update(recipe_ids, IngredientsInRecipe.objects.filter(
+            recipe_id__in=recipe_ids
+        ).values_list('recipe_id', 'ingredient_id'))
+    _changes_since = since - timedelta(seconds=settings.PANTRY_CHANGES_OVERLAP)
+
+
+def get_index():
+    """
+    Возвращает индекс продуктов процесса.
+
+    После изменения состава рецептов (метка версии PANTRY_SCOPE) индекс
+    дополняется из журнала, а целиком перестраивается не реже, чем раз
+    в PANTRY_INDEX_TTL секунд.
+    """
+    global _index_version
+    version = get_version(PANTRY_SCOPE)
+    expired = time.monotonic() - _index_built > settings.PANTRY_INDEX_TTL
+    if _index is None or _index_version != version or expired:
+        with _lock:
+            expired = (
+                time.monotonic() - _index_built > settings.PANTRY_INDEX_TTL
+            )
+            if _index is None or expired:
+                rebuild()
+            elif _index_version != version:
+                apply_changes()
+            _index_version = version
+    return _index
+
+
+def match_pantry(ingredient_ids, limit):
+    """
+    Подбирает рецепты по продуктам с недостающими ингредиентами.
+
+    Returns:
+        list: Пары (рецепт, словари недостающих ингредиентов).
+    """
+    ingredients = reference.ingredients.get()
+    return [
+        (recipe_id, [ingredients.get(pk) for pk in missing])
+        for recipe_id, missing in get_index().match(
+            set(ingredient_ids), limit
+        )
+    ]
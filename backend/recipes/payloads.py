@@ -0,0 +1,111 @@
+from collections import defaultdict
+
+from recipes import reference
+from recipes.images import build_variant_urls
+from recipes.models import IngredientsInRecipe, Recipe
+
+# Поля рецепта и автора в порядке полей RecipeSerializer
+RECIPE_FIELDS = (
+    'id', 'name', 'image', 'image_variants', 'text', 'cooking_time',
+    'author_id', 'author__email', 'author__username', 'author__first_name',
+    'author__last_name',
+)
+
+
+def serialize_recipe_payloads(recipe_ids):
+    """
+    Собирает представления рецептов через RecipeSerializer.
+
+    Эталон для build_recipe_payloads и запасной путь, если справочники
+    в памяти еще не видят новых тегов или ингредиентов.
+    """
+    from recipes.serializers import RecipeSerializer
+
+    recipes = Recipe.objects.filter(
+        id__in=recipe_ids
+    ).with_related().without_user_flags()
+    return {
+        payload['id']: payload
+        for payload in RecipeSerializer(recipes, many=True).data
+    }
+
+
+def build_recipe_payloads(recipe_ids):
+    """
+    Собирает представления рецептов из кортежей values_list.
+
+    Результат совпадает с RecipeSerializer без запроса (флаги
+    пользователя - False, ссылки относительные), но словари строятся
+    напрямую, без полей сериализатора. Теги и ингредиенты берутся из
+    справочников в памяти.
+
+    Args:
+        recipe_ids (Iterable[int]): Идентификаторы рецептов.
+
+    Returns:
+        dict: Представления рецептов по идентификатору.
+    """
+    recipe_ids = list(recipe_ids)
+    tag_data = reference.tags.get().data
+    ingredient_data = reference.ingredients.get().data
+    tags = defaultdict(list)
+    for recipe_id, tag_id in Recipe.tags.through.objects.filter(
+        recipe_id__in=recipe_ids
+    ).order_by('tag_id').values_list('recipe_id', 'tag_id'):
+        tags[recipe_id].append(tag_id)
+    ingredients = defaultdict(list)
+    for recipe_id, ingredient_id, amount in IngredientsInRecipe.objects.filter(
+        recipe_id__in=recipe_ids
+    ).order_by('id').values_list('recipe_id', 'ingredient_id', 'amount'):
+        ingredients[recipe_id].append((ingredient_id, amount))
+
+    storage = Recipe._meta.get_field('image').storage
+    payloads = {}
+    stale = []
+    for (
+        recipe_id, name, image, variants, text, cooking_time, author_id,
+        email, username, first_name, last_name,
+    ) in Recipe.objects.filter(id__in=recipe_ids).values_list(
+        *RECIPE_FIELDS
+    ):
+        recipe_tags = [tag_data.get(tag_id) for tag_id in tags[recipe_id]]
+        recipe_ingredients = [
+            (ingredient_data.get(ingredient_id), amount)
+            for ingredient_id, amount in ingredients[recipe_id]
+        ]
+        if None in recipe_tags or any(
+            ingredient is None for ingredient, _ in recipe_ingredients
+        ):
+            stale.append(recipe_id)
+            continue
+        payloads[recipe_id] = {
+            'id': recipe_id,
+            'tags': [dict(tag) for tag in recipe_tags],
+            'name': name,
+            'author': {
+                'email': email,
+                'id': author_id,
+                'username': username,
+                'first_name': first_name,
+                'last_name': last_name,
+                'is_subscribed': False,
+            },
+            'ingredients': [
+                {
+                    'id': ingredient['id'],
+                    'name': ingredient['name'],
+                    'measurement_unit': ingredient['measurement_unit'],
+                    'amount': amount,
+                }
+                for ingredient, amount in recipe_ingredients
+            ],
+            'image': storage.url(image) if image else None,
+            'image_variants': build_variant_urls(storage, image, variants),
+            'text': text,
+            'cooking_time': cooking_time,
+            'is_favorited': False,
+            'is_in_shopping_cart': False,
+        }
+    if stale:
+        payloads.update(serialize_recipe_payloads(stale))
+    return payloads
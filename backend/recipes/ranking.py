@@ -0,0 +1,208 @@
+from collections import defaultdict
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import (Case, ExpressionWrapper, F, FloatField, Value,
+                              When)
+from django.db.models.functions import Greatest
+from django.utils import timezone
+
+from recipes.models import (Favorite, RankingState, Recipe, RecipeEvent,
+                            ShoppingCart)
+from recipes.versions import bump_version
+
+# Тип события для каждой модели связи
+EVENT_KINDS = {
+    Favorite: RecipeEvent.FAVORITE,
+    ShoppingCart: RecipeEvent.SHOPPING_CART,
+}
+
+# Сортировки списка рецептов по параметру ?ordering=
+ORDERINGS = {
+    'trending': ('-trending_score', '-id'),
+    'popular': ('-popularity_score', '-id'),
+}
+
+# Метка версии рейтингов (для условных запросов к отсортированным спискам)
+SCORES_SCOPE = 'recipe-scores'
+
+
+def get_ordering(request):
+    """
+    Сортировка из параметра ?ordering=; None для сортировки по дате.
+    """
+    return ORDERINGS.get(request.query_params.get('ordering'))
+
+
+def record_events(model, entries, delta):
+    """
+    Записывает события добавления или удаления рецептов одним INSERT.
+
+    Args:
+        model (Model): Favorite или ShoppingCart.
+        entries (Iterable[tuple]): Пары (рецепт, время добавления); при
+            удалении передается время удаленного добавления.
+        delta (int): 1 при добавлении, -1 при удалении.
+    """
+    kind = EVENT_KINDS[model]
+    RecipeEvent.objects.bulk_create([
+        RecipeEvent(recipe_id=recipe_id, kind=kind, delta=delta, added=added)
+        for recipe_id, added in entries
+    ])
+
+
+def lock_state():
+    """
+    Блокирует строку состояния рейтингов, создавая ее при первом вызове.
+
+    Обработка событий и перенос точки отсчета идут под этой блокировкой,
+    поэтому события не прибавляются с множителем от старой точки к уже
+    пересчитанным рейтингам.
+    """
+    RankingState.objects.get_or_create(
+        pk=1, defaults={'trending_epoch': settings.TRENDING_EPOCH}
+    )
+    return RankingState.objects.select_for_update().get(pk=1)
+
+
+def trending_weight(added, epoch):
+    """
+    Множитель события в рейтинге трендов.
+
+    Вместо уменьшения всех рейтингов со временем вклад новых событий
+    растет экспоненциально: порядок рецептов от этого не меняется, а
+    обновлять нужно только рецепты с новыми событиями.
+    """
+    elapsed = added.timestamp() - epoch
+    return 2 ** (elapsed / settings.TRENDING_HALF_LIFE)
+
+
+def score_changes(events, epoch):
+    """
+    Суммирует изменения рейтингов по рецептам.
+
+    Returns:
+        dict: Пары (изменение трендов, изменение популярности) по рецептам.
+    """
+    changes = defaultdict(lambda: [0.0, 0.0])
+    for recipe_id, kind, delta, added in events:
+        points = settings.RANKING_WEIGHTS[kind] * delta
+        changes[recipe_id][0] += points * trending_weight(added, epoch)
+        changes[recipe_id][1] += points
+    return changes
+
+
+def add_scores(changes):
+    """
+    Прибавляет изменения к рейтингам одним UPDATE с CASE по рецептам.
+
+    Рейтинг трендов не опускается ниже нуля: после переноса точки
+    отсчета добавление и его удаление могут различаться в последнем
+    знаке из-за округления.
+    """
+    def by_recipe(index):
+        return Case(
+            *(
+                When(id=recipe_id, then=Value(change[index]))
+                for recipe_id, change in changes.items()
+            ),
+            default=Value(0.0),
+            output_field=FloatField(),
+        )
+
+    Recipe.objects.filter(id__in=changes).update(
+        trending_score=Greatest(
+            F('trending_score') + by_recipe(0), Value(0.0)
+        ),
+        popularity_score=F('popularity_score') + by_recipe(1),
+    )
+
+
+@transaction.atomic
+def process_batch(batch_size):
+    """
+    Переносит в рейтинги одну пачку необработанных событий.
+
+    Строки событий блокируются с SKIP LOCKED, поэтому несколько
+    запущенных команд не обработают одно событие дважды.
+
+    Returns:
+        int: Число обработанных событий.
+    """
+    state = lock_state()
+    events = list(
+        RecipeEvent.objects.select_for_update(skip_locked=True).order_by(
+            'id'
+        ).values_list('id', 'recipe_id', 'kind', 'delta', 'added')[
+            :batch_size
+        ]
+    )
+    if not events:
+        return 0
+    add_scores(score_changes(
+        (event[1:] for event in events), state.trending_epoch
+    ))
+    RecipeEvent.objects.filter(id__in=[event[0] for event in events]).delete()
+    return len(events)
+
+
+@transaction.atomic
+def rebase():
+    """
+    Переносит точку отсчета трендов на текущий момент.
+
+    Рейтинги трендов умножаются на 2 ** (-сдвиг / TRENDING_HALF_LIFE),
+    поэтому порядок рецептов и вклад уже учтенных событий сохраняются,
+    а множители новых событий снова начинаются с единицы.
+    """
+    state = lock_state()
+    epoch = timezone.now().timestamp()
+    factor = 2 ** ((state.trending_epoch - epoch) / settings.TRENDING_HALF_LIFE)
+    Recipe.objects.update(trending_score=F('trending_score') * factor)
+    state.trending_epoch = epoch
+    state.save(update_fields=['trending_epoch'])
+
+
+def update_scores(batch_size=None):
+    """
+    Обрабатывает все события, накопленные с прошлого запуска.
+
+    Если с точки отсчета трендов прошло больше TRENDING_REBASE_PERIODS
+    периодов полураспада, она переносится на текущий момент.
+
+    Returns:
+        int: Число обработанных событий.
+    """
+    batch_size = batch_size or settings.RANKING_BATCH_SIZE
+    total = 0
+    while True:
+        processed = process_batch(batch_size)
+        total += processed
+        if processed < batch_size:
+            break
+    epoch = RankingState.objects.values_list(
+        'trending_epoch', flat=True
+    ).first()
+    elapsed = timezone.now().timestamp() - (epoch or settings.TRENDING_EPOCH)
+    if elapsed > settings.TRENDING_REBASE_PERIODS * settings.TRENDING_HALF_LIFE:
+        rebase()
+    if total:
+        bump_version(SCORES_SCOPE)
+    return total
+
+
+def rebuild_popularity():
+    """
+    Пересчитывает популярность по счетчикам избранного и корзин.
+
+    Сначала обрабатываются накопленные события, чтобы они не были
+    учтены повторно. Рейтинг трендов не пересчитывается.
+    """
+    update_scores()
+    weights = settings.RANKING_WEIGHTS
+    Recipe.objects.update(popularity_score=ExpressionWrapper(
+        weights[RecipeEvent.FAVORITE] * F('favorites_count')
+        + weights[RecipeEvent.SHOPPING_CART] * F('in_carts_count'),
+        output_field=FloatField(),
+    ))
+    bump_version(SCORES_SCOPE)
@@ -0,0 +1,119 @@
+import logging
+import threading
+
+from django.db import DatabaseError
+
+from recipes.versions import get_version
+
+logger = logging.getLogger(__name__)
+
+
+class ReferenceData:
+    """
+    Снимок справочника: объекты и их готовые представления.
+
+    Атрибуты:
+        objects (dict): Объекты модели по идентификатору.
+        data (dict): Сериализованные словари по идентификатору.
+        items (list): Словари в порядке сортировки модели.
+    """
+
+    def __init__(self, objects, serializer_class):
+        self.objects = {obj.id: obj for obj in objects}
+        self.data = {
+            obj.id: dict(serializer_class(obj).data) for obj in objects
+        }
+        self.items = [self.data[obj.id] for obj in objects]
+
+    def get(self, pk):
+        """
+        Возвращает представление по идентификатору (строке или числу).
+        """
+        try:
+            return self.data.get(int(pk))
+        except (TypeError, ValueError):
+            return None
+
+
+class ReferenceRegistry:
+    """
+    Справочник в памяти процесса, общий для всех запросов воркера.
+
+    Снимок перестраивается, когда меняется метка версии scope: она
+    обновляется при сохранении и удалении записей, поэтому все воркеры
+    видят изменения без перезапуска.
+
+    Атрибуты:
+        scope (str): Имя метки версии.
+        load (callable): Возвращает объекты и класс сериализатора.
+    """
+
+    def __init__(self, scope, load):
+        self.scope = scope
+        self.load = load
+        self._snapshot = None
+        self._version = None
+        self._lock = threading.Lock()
+
+    def get(self):
+        version = get_version(self.scope)
+        if self._snapshot is None or self._version != version:
+            with self._lock:
+                if self._snapshot is None or self._version != version:
+                    self._snapshot = ReferenceData(*self.load())
+                    self._version = version
+        return self._snapshot
+
+    def for_serializer(self, field):
+        """
+        Снимок, общий для всех полей одного корневого сериализатора.
+
+        get() сверяет метку версии с кэшем при каждом вызове, и при
+        сериализации списка это было бы обращение к кэшу на каждую
+        строку. Поэтому снимок запоминается в корневом сериализаторе
+        при первом обращении и дальше берется оттуда.
+
+        Args:
+            field (Field): Поле или вложенный сериализатор.
+
+        Returns:
+            ReferenceData: Снимок справочника.
+        """
+        snapshots = field.root.__dict__.setdefault('_reference_snapshots', {})
+        snapshot = snapshots.get(self.scope)
+        if snapshot is None:
+            snapshot = snapshots[self.scope] = self.get()
+        return snapshot
+
+
+def load_tags():
+    from tags.models import Tag
+    from tags.serializers import TagSerializer
+    return list(Tag.objects.all()), TagSerializer
+
+
+def load_ingredients():
+    from recipes.models import Ingredient
+    from recipes.serializers import IngredientSerializer
+    return list(Ingredient.objects.all()), IngredientSerializer
+
+
+tags = ReferenceRegistry('tags', load_tags)
+ingredients = ReferenceRegistry('ingredients', load_ingredients)
+
+
+def warm_up():
+    """
+    Загружает справочники и индексы ингредиентов при старте воркера.
+
+    Ошибка базы (например, до применения миграций) не мешает запуску:
+    справочники загрузятся при первом обращении.
+    """
+    from recipes import autocomplete, pantry
+    try:
+        tags.get()
+        ingredients.get()
+        autocomplete.get_index()
+        pantry.get_index()
+    except DatabaseError:
+        logger.warning('Справочники не загружены при старте', exc_info=True)
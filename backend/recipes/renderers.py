@@ -0,0 +1,55 @@
+from rest_framework.exceptions import NotAcceptable
+from rest_framework.negotiation import DefaultContentNegotiation
+from rest_framework.renderers import BaseRenderer
+
+
+class ShoppingListRenderer(BaseRenderer):
+    """
+    Базовый рендерер файла списка покупок.
+
+    Файл отдается потоковым ответом, поэтому рендерер нужен для выбора
+    формата (?format= или заголовок Accept) и для вывода ошибок.
+    """
+    charset = 'utf-8'
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if data is None:
+            return b''
+        if isinstance(data, dict) and 'detail' in data:
+            data = data['detail']
+        return str(data).encode(self.charset)
+
+
+class ShoppingListTextRenderer(ShoppingListRenderer):
+    media_type = 'text/plain'
+    format = 'txt'
+
+
+class ShoppingListCSVRenderer(ShoppingListRenderer):
+    media_type = 'text/csv'
+    format = 'csv'
+
+
+class ShoppingListPDFRenderer(ShoppingListRenderer):
+    media_type = 'application/pdf'
+    format = 'pdf'
+
+
+class ShoppingListNegotiation(DefaultContentNegotiation):
+    """
+    Выбор формата списка покупок.
+
+    Явно запрошенный ?format= проверяется как обычно, а неподходящий
+    заголовок Accept (например, application/json) приводит к формату
+    по умолчанию вместо ошибки 406.
+    """
+
+    def select_renderer(self, request, renderers, format_suffix=None):
+        try:
+            return super().select_renderer(request, renderers, format_suffix)
+        except NotAcceptable:
+            if format_suffix or request.query_params.get(
+                self.settings.URL_FORMAT_OVERRIDE
+            ):
+                raise
+            return renderers[0], renderers[0].media_type
@@ -0,0 +1,284 @@
+import math
+import re
+import threading
+from bisect import bisect_left
+from collections import Counter, defaultdict
+
+from django.conf import settings
+from django.contrib.postgres.aggregates import StringAgg
+from django.contrib.postgres.search import (SearchQuery, SearchRank,
+                                            SearchVector, TrigramSimilarity)
+from django.db import connection, connections, transaction
+from django.db.models import Case, F, OuterRef, Q, Subquery, When
+
+from recipes.autocomplete import MAX_CHAR, trigrams
+from recipes.models import IngredientsInRecipe, Recipe
+from recipes.versions import bump_version, get_version
+
+TOKEN_RE = re.compile(r'\w+')
+
+# Вес совпадения в поле рецепта для локального индекса
+FIELD_WEIGHTS = {'name': 3.0, 'ingredients': 2.0, 'text': 1.0}
+
+# Сколько похожих слов словаря подставлять вместо слова из запроса
+MAX_EXPANSIONS = 10
+
+# Триграммные индексы для полей поиска админки: имя, таблица и колонка
+ADMIN_SEARCH_INDEXES = (
+    ('recipe_name_upper_trgm_idx', 'recipes_recipe', 'name'),
+    ('ingredient_name_upper_trgm_idx', 'recipes_ingredient', 'name'),
+    ('user_username_upper_trgm_idx', 'users_user', 'username'),
+    ('user_email_upper_trgm_idx', 'users_user', 'email'),
+    ('user_last_name_upper_trgm_idx', 'users_user', 'last_name'),
+)
+
+
+def tokenize(text):
+    return [token for token in TOKEN_RE.findall(text.casefold())
+            if len(token) > 1]
+
+
+def use_postgres():
+    return connection.vendor == 'postgresql'
+
+
+class PostgresSearchBackend:
+    """
+    Поиск средствами PostgreSQL.
+
+    Рецепт находится по tsvector-полю search_vector (GIN-индекс) или по
+    триграммному сходству названия (GIN-индекс gin_trgm_ops).
+    """
+
+    def filter(self, queryset, query):
+        search_query = SearchQuery(
+            query, config=settings.SEARCH_CONFIG, search_type='websearch'
+        )
+        return queryset.annotate(
+            rank=SearchRank(F('search_vector'), search_query),
+            similarity=TrigramSimilarity('name', query),
+        ).filter(
+            Q(search_vector=search_query) | Q(name__trigram_similar=query)
+        ).order_by('-rank', '-similarity', '-pub_date')
+
+
+class LocalSearchIndex:
+    """
+    Инвертированный индекс рецептов в памяти процесса.
+
+    Используется, когда база не PostgreSQL (например, SQLite в тестах).
+    Слово запроса сопоставляется со словами словаря точно, по префиксу
+    и по триграммному сходству; рецепт ранжируется по числу найденных
+    слов запроса, затем по сумме весов tf-idf.
+
+    Атрибуты:
+        postings (dict): Вес рецептов по слову.
+        vocabulary (list): Отсортированный словарь.
+    """
+
+    def __init__(self, documents):
+        self.postings = defaultdict(Counter)
+        for recipe_id, fields in documents.items():
+            for field, text in fields.items():
+                for token in tokenize(text):
+                    self.postings[token][recipe_id] += FIELD_WEIGHTS[field]
+        self.size = len(documents)
+        self.vocabulary = sorted(self.postings)
+        self.trigrams = defaultdict(list)
+        for token in self.vocabulary:
+            for trigram in trigrams(token):
+                self.trigrams[trigram].append(token)
+
+    def expand(self, token):
+        """
+        Возвращает пары (слово словаря, коэффициент) для слова запроса.
+        """
+        terms = {}
+        start = bisect_left(self.vocabulary, token)
+        end = bisect_left(self.vocabulary, token + MAX_CHAR, start)
+        for term in self.vocabulary[start:end][:MAX_EXPANSIONS]:
+            terms[term] = 1.0 if term == token else 0.8
+        if terms:
+            return terms
+        token_trigrams = trigrams(token)
+        matches = Counter()
+        for trigram in token_trigrams:
+            matches.update(self.trigrams.get(trigram, ()))
+        for term, common in matches.most_common(MAX_EXPANSIONS):
+            similarity = common / len(token_trigrams | trigrams(term))
+            if similarity >= settings.SEARCH_TRIGRAM_SIMILARITY:
+                terms[term] = similarity
+        return terms
+
+    def search(self, query):
+        """
+        Ищет рецепты по запросу.
+
+        Returns:
+            list: Идентификаторы рецептов по убыванию релевантности.
+        """
+        scores = Counter()
+        matched = Counter()
+        for token in set(tokenize(query)):
+            found = set()
+            for term, factor in self.expand(token).items():
+                postings = self.postings[term]
+                idf = math.log(1 + self.size / len(postings))
+                for recipe_id, weight in postings.items():
+                    scores[recipe_id] += weight * idf * factor
+                    found.add(recipe_id)
+            matched.update(found)
+        return sorted(
+            scores, key=lambda pk: (-matched[pk], -scores[pk], -pk)
+        )
+
+    @classmethod
+    def from_db(cls):
+        documents = {
+            recipe['id']: {
+                'name': recipe['name'], 'text': recipe['text'],
+                'ingredients': '',
+            }
+            for recipe in Recipe.objects.values('id', 'name', 'text')
+        }
+        for recipe_id, name in IngredientsInRecipe.objects.values_list(
+            'recipe_id', 'ingredient__name'
+        ):
+            documents[recipe_id]['ingredients'] += f' {name}'
+        return cls(documents)
+
+
+class LocalSearchBackend:
+    """
+    Поиск по локальному инвертированному индексу.
+
+    Индекс перестраивается при изменении метки версии 'recipes-search'.
+    """
+
+    def __init__(self):
+        self.index = None
+        self.version = None
+        self.lock = threading.Lock()
+
+    def get_index(self):
+        version = get_version('recipes-search')
+        if self.index is None or self.version != version:
+            with self.lock:
+                if self.index is None or self.version != version:
+                    self.index = LocalSearchIndex.from_db()
+                    self.version = version
+        return self.index
+
+    def filter(self, queryset, query):
+        recipe_ids = self.get_index().search(query)
+        return queryset.filter(id__in=recipe_ids).order_by(Case(
+            *(When(id=recipe_id, then=position)
+              for position, recipe_id in enumerate(recipe_ids)),
+            default=len(recipe_ids),
+        ))
+
+
+_local_backend = LocalSearchBackend()
+
+
+def get_search_backend():
+    if use_postgres():
+        return PostgresSearchBackend()
+    return _local_backend
+
+
+def search_recipes(queryset, query):
+    return get_search_backend().filter(queryset, query)
+
+
+def refresh_search_vectors(recipe_ids, using='default'):
+    """
+    Пересчитывает search_vector рецептов одним UPDATE.
+    """
+    ingredient_names = IngredientsInRecipe.objects.filter(
+        recipe=OuterRef('pk')
+    ).values('recipe').annotate(
+        names=StringAgg('ingredient__name', ' ')
+    ).values('names')
+    config = settings.SEARCH_CONFIG
+    recipes = Recipe.objects.using(using).filter(id__in=recipe_ids)
+    recipes.update(search_vector=(
+        SearchVector('name', weight='A', config=config)
+        + SearchVector(Subquery(ingredient_names), weight='B', config=config)
+        + SearchVector('text', weight='C', config=config)
+    ))
+
+
+def backfill_search_vectors(rebuild=False, using='default', batch_size=None):
+    """
+    Заполняет search_vector рецептов, у которых его нет.
+
+    Нужна для рецептов, созданных до появления поля или загруженных в
+    обход сигналов. Рецепты обрабатываются пачками по возрастанию id.
+
+    Args:
+        rebuild (bool): Пересчитать векторы всех рецептов.
+        using (str): Псевдоним базы данных.
+        batch_size (int): Размер пачки (по умолчанию SEARCH_BATCH_SIZE).
+
+    Returns:
+        int: Число обновленных рецептов.
+    """
+    batch_size = batch_size or settings.SEARCH_BATCH_SIZE
+    recipes = Recipe.objects.using(using).order_by('id')
+    if not rebuild:
+        recipes = recipes.filter(search_vector__isnull=True)
+    updated, last_id = 0, 0
+    while True:
+        recipe_ids = list(
+            recipes.filter(id__gt=last_id).values_list('id', flat=True)[
+                :batch_size
+            ]
+        )
+        if not recipe_ids:
+            return updated
+        refresh_search_vectors(recipe_ids, using)
+        updated += len(recipe_ids)
+        last_id = recipe_ids[-1]
+
+
+def recipes_changed(recipe_ids):
+    """
+    Обновляет поисковые данные рецептов после фиксации транзакции.
+
+    Args:
+        recipe_ids (Iterable[int]): Идентификаторы измененных рецептов.
+    """
+    if not use_postgres():
+        bump_version('recipes-search')
+        return
+    recipe_ids = list(recipe_ids)
+    if recipe_ids:
+        transaction.on_commit(lambda: refresh_search_vectors(recipe_ids))
+
+
+def create_search_indexes(sender, using='default', **kwargs):
+    """
+    Создает GIN-индексы для поиска после миграций (только PostgreSQL).
+
+    Заодно заполняет search_vector рецептов, у которых его еще нет.
+    """
+    if connections[using].vendor != 'postgresql':
+        return
+    with connections[using].cursor() as cursor:
+        cursor.execute('CREATE EXTENSION IF NOT EXISTS pg_trgm')
+        cursor.execute(
+            'CREATE INDEX IF NOT EXISTS recipe_search_vector_idx '
+            'ON recipes_recipe USING gin (search_vector)'
+        )
+        cursor.execute(
+            'CREATE INDEX IF NOT EXISTS recipe_name_trgm_idx '
+            'ON recipes_recipe USING gin (name gin_trgm_ops)'
+        )
+        # Поиск в админке (icontains) сравнивает UPPER(поле) через LIKE
+        for name, table, column in ADMIN_SEARCH_INDEXES:
+            cursor.execute(
+                f'CREATE INDEX IF NOT EXISTS {name} ON {table} '
+                f'USING gin ((UPPER({column}::text)) gin_trgm_ops)'
+            )
+    backfill_search_vectors(using=using)
@@ -1,12 +1,19 @@
 import users.serializers as users
 from django.conf import settings
+from django.db import transaction
 from drf_extra_fields.fields import Base64ImageField
 from rest_framework import serializers, validators
 from tags.models import Tag
 from tags.serializers import TagField
 
-from recipes.models import (Favorite, Ingredient, IngredientsInRecipe, Recipe,
-                            ShoppingCart)
+from recipes import membership, reference
+from recipes.fields import (BulkPrimaryKeyRelatedField, ImageVariantsField,
+                            resolve_primary_keys)
+from recipes.models import Ingredient, IngredientsInRecipe, Recipe
+from recipes.signals import ingredients_changed
+
+# Поля краткого представления рецепта
+SHORT_RECIPE_FIELDS = ('id', 'name', 'image', 'image_variants', 'cooking_time')
 
 
 class IngredientSerializer(serializers.ModelSerializer):
@@ -45,22 +52,60 @@ class IngredientInRecipeSerializer(serializers.ModelSerializer):
         ),
     )
 
+    def to_representation(self, instance):
+        ingredient = reference.ingredients.for_serializer(self).get(
+            instance.ingredient_id
+        )
+        if ingredient is None:
+            return super().to_representation(instance)
+        return {
+            'id': ingredient['id'],
+            'name': ingredient['name'],
+            'measurement_unit': ingredient['measurement_unit'],
+            'amount': instance.amount,
+        }
+
     def __str__(self):
         return f'{self.ingredient} в {self.recipe}'
 
+class AddIngredientListSerializer(serializers.ListSerializer):
+    """
+    Список ингредиентов рецепта.
+
+    Повторы находятся через множество, а все ингредиенты загружаются
+    одним запросом после проверки отдельных элементов.
+    """
+
+    def to_internal_value(self, data):
+        items = super().to_internal_value(data)
+        pks = [item['id'] for item in items]
+        if len(set(pks)) != len(pks):
+            raise serializers.ValidationError(
+                settings.NOT_REPEATS_INGREDIENTS
+            )
+        ingredients = resolve_primary_keys(Ingredient.objects.all(), pks)
+        for item, ingredient in zip(items, ingredients):
+            item['id'] = ingredient
+        return items
+
+
 class AddIngredientSerializer(serializers.ModelSerializer):
     """
     Сериализатор для добавления ингредиентов в рецепт.
 
+    Поле id проверяется только как число: объекты ингредиентов
+    подставляет AddIngredientListSerializer.
+
     Атрибуты:
         Meta (class): Класс Meta с информацией о модели и полях, которые следует сериализовать.
     """
-    id = serializers.PrimaryKeyRelatedField(queryset=Ingredient.objects.all())
+    id = serializers.IntegerField()
     amount = serializers.IntegerField()
 
     class Meta:
         model = IngredientsInRecipe
         fields = ('id', 'amount')
+        list_serializer_class = AddIngredientListSerializer
 
 class RecipeSerializer(serializers.ModelSerializer):
     """
@@ -72,6 +117,7 @@ class RecipeSerializer(serializers.ModelSerializer):
         ingredients (IngredientInRecipeSerializer): Сериализатор для ингредиентов в рецепте.
         is_favorited (SerializerMethodField): Поле для определения, добавлен ли рецепт в избранное.
         is_in_shopping_cart (SerializerMethodField): Поле для определения, добавлен ли рецепт в корзину.
+        image_variants (ImageVariantsField): Ссылки на уменьшенные копии изображения.
 
     Атрибуты Meta:
         model (class): Модель, которую сериализуем.
@@ -86,6 +132,7 @@ class RecipeSerializer(serializers.ModelSerializer):
         read_only=True, many=True
     )
     image = Base64ImageField()
+    image_variants = ImageVariantsField()
     is_favorited = serializers.SerializerMethodField(
         method_name='get_is_favorited'
     )
@@ -102,36 +149,46 @@ class RecipeSerializer(serializers.ModelSerializer):
             'author',
             'ingredients',
             'image',
+            'image_variants',
             'text',
             'cooking_time',
             'is_favorited',
             'is_in_shopping_cart'
         )
 
-    def in_list(self, obj, model):
+    def to_representation(self, instance):
+        if hasattr(instance, 'author_is_subscribed'):
+            instance.author.is_subscribed = instance.author_is_subscribed
+        return super().to_representation(instance)
+
+    def in_list(self, obj, kind, annotation):
+        if hasattr(obj, annotation):
+            return getattr(obj, annotation)
         request = self.context.get('request')
-        if request is None or request.user.is_anonymous:
+        if request is None:
             return False
-        return model.objects.filter(user=request.user, recipe=obj).exists()
+        return membership.is_member(request.user, kind, obj.id)
 
     def get_is_favorited(self, obj):
-        return self.in_list(obj, Favorite)
+        return self.in_list(obj, membership.FAVORITES, 'is_favorited')
 
     def get_is_in_shopping_cart(self, obj):
-        return self.in_list(obj, ShoppingCart)
+        return self.in_list(
+            obj, membership.SHOPPING_CART, 'is_in_shopping_cart'
+        )
 
 class AddRecipeSerializer(serializers.ModelSerializer):
     """
     Сериализатор для создания и обновления рецепта.
 
     Атрибуты:
-        tags (PrimaryKeyRelatedField): Поле для сериализации тегов.
+        tags (BulkPrimaryKeyRelatedField): Поле для сериализации тегов.
         ingredients (AddIngredientSerializer): Сериализатор для ингредиентов.
         image (Base64ImageField): Поле для загрузки изображения блюда.
 
     Методы:
         to_representation(self, instance): Преобразует объект рецепта в представление.
-        create_ingredients(self, ingredients, recipe): Создает связи между рецептом и ингредиентами.
+        save_ingredients(self, recipe, ingredients, current): Приводит ингредиенты рецепта к переданному списку.
         create(self, validated_data): Создает новый рецепт и связи с ингредиентами и тегами.
         update(self, instance, validated_data): Обновляет существующий рецепт и связи с ингредиентами и тегами.
         validate(self, data): Проверяет корректность данных перед созданием рецепта.
@@ -141,7 +198,7 @@ class AddRecipeSerializer(serializers.ModelSerializer):
         model (class): Модель, которую сериализуем.
         fields (tuple): Поля модели, которые следует сериализовать.
     """
-    tags = serializers.PrimaryKeyRelatedField(
+    tags = BulkPrimaryKeyRelatedField(
         queryset=Tag.objects.all(),
         many=True
     )
@@ -160,34 +217,86 @@ class AddRecipeSerializer(serializers.ModelSerializer):
         )
 
     def to_representation(self, instance):
+        instance = Recipe.objects.with_related().get(id=instance.id)
         serializer = RecipeSerializer(instance)
         return serializer.data
 
-    def create_ingredients(self, ingredients, recipe):
-        for ingredient in ingredients:
-            amount = ingredient['amount']
-            ingredient = ingredient['id']
-            IngredientsInRecipe.objects.get_or_create(
-                recipe=recipe,
-                ingredient=ingredient,
-                amount=amount
+    def save_ingredients(self, recipe, ingredients, current=None):
+        """
+        Приводит ингредиенты рецепта к переданному списку.
+
+        Новые строки вставляются одним bulk_create, измененные количества
+        обновляются одним bulk_update, удаленные строки удаляются одним
+        DELETE без построчных сигналов. Кэш, поиск, похожие рецепты,
+        журнал продуктов и списки покупок обновляет один сигнал
+        ingredients_changed на весь рецепт.
+
+        Args:
+            recipe (Recipe): Рецепт.
+            ingredients (list): Проверенные данные ингредиентов.
+            current (dict): Текущие строки по ингредиенту; если не
+                переданы, загружаются из базы.
+        """
+        if current is None:
+            current = {
+                row.ingredient_id: row
+                for row in IngredientsInRecipe.objects.filter(
+                    recipe=recipe
+                ).only('id', 'ingredient_id', 'amount')
+            }
+        old_amounts = {
+            ingredient_id: row.amount for ingredient_id, row in current.items()
+        }
+        new_amounts = {
+            ingredient['id'].id: ingredient['amount']
+            for ingredient in ingredients
+        }
+        created, changed = [], []
+        for ingredient_id, amount in new_amounts.items():
+            row = current.get(ingredient_id)
+            if row is None:
+                created.append(IngredientsInRecipe(
+                    recipe=recipe, ingredient_id=ingredient_id, amount=amount
+                ))
+            elif row.amount != amount:
+                row.amount = amount
+                changed.append(row)
+        removed = [
+            row.id for ingredient_id, row in current.items()
+            if ingredient_id not in new_amounts
+        ]
+        if created:
+            IngredientsInRecipe.objects.bulk_create(created)
+        if changed:
+            IngredientsInRecipe.objects.bulk_update(changed, ('amount',))
+        if removed:
+            # На строки состава никто не ссылается, поэтому каскад не
+            # нужен, а построчные post_delete повторили бы работу
+            # ingredients_changed для каждой удаленной строки
+            queryset = IngredientsInRecipe.objects.filter(id__in=removed)
+            queryset._raw_delete(queryset.db)
+        if old_amounts != new_amounts:
+            ingredients_changed.send(
+                sender=Recipe,
+                recipe_id=recipe.id,
+                old_amounts=old_amounts,
+                new_amounts=new_amounts,
             )
 
+    @transaction.atomic
     def create(self, validated_data):
         ingredients = validated_data.pop('ingredients')
         tags = validated_data.pop('tags')
         recipe = Recipe.objects.create(**validated_data)
         recipe.tags.set(tags)
-        recipe.save()
-        self.create_ingredients(ingredients, recipe)
+        self.save_ingredients(recipe, ingredients, current={})
         return recipe
 
+    @transaction.atomic
     def update(self, instance, validated_data):
         ingredients = validated_data.pop('ingredients')
         tags = validated_data.pop('tags')
-        instance.ingredients.clear()
-        self.create_ingredients(ingredients, instance)
-        instance.tags.clear()
+        self.save_ingredients(instance, ingredients)
         instance.tags.set(tags)
         return super().update(instance, validated_data)
 
@@ -197,7 +306,6 @@ class AddRecipeSerializer(serializers.ModelSerializer):
             raise serializers.ValidationError(
                 settings.THE_FIELD_WITH_INGREDIENTS_CANNOT_BE_EMPTY
             )
-        unique_ings = []
         for ingredient in ings:
             name = ingredient['id']
             if int(ingredient['amount']) <= 0:
@@ -208,12 +316,6 @@ class AddRecipeSerializer(serializers.ModelSerializer):
                 raise serializers.ValidationError(
                     settings.MUST_BE_INTEGER
                 )
-            if name not in unique_ings:
-                unique_ings.append(name)
-            else:
-                raise serializers.ValidationError(
-                    settings.NOT_REPEATS_INGREDIENTS
-                )
         return data
 
     def validate_cooking_time(self, data):
@@ -231,6 +333,22 @@ class ShortRecipeSerializer(serializers.ModelSerializer):
         model (class): Модель, которую сериализуем.
         fields (tuple): Поля модели, которые следует сериализовать.
     """
+    image_variants = ImageVariantsField()
+
     class Meta:
         model = Recipe
-        fields = ('id', 'name', 'image', 'cooking_time')
\ No newline at end of file
+        fields = SHORT_RECIPE_FIELDS
+
+
+class RecipeIdsSerializer(serializers.Serializer):
+    """
+    Список рецептов для массового добавления в избранное или корзину.
+
+    Атрибуты:
+        recipes (BulkPrimaryKeyRelatedField): Рецепты, загружаемые одним запросом.
+    """
+    recipes = BulkPrimaryKeyRelatedField(
+        queryset=Recipe.objects.only(*SHORT_RECIPE_FIELDS),
+        many=True,
+        allow_empty=False,
+    )
@@ -0,0 +1,160 @@
+from collections import defaultdict
+
+from django.db import models, transaction
+
+from recipes.models import IngredientsInRecipe, ShoppingCart, ShoppingListItem
+
+
+def get_recipe_amounts(recipe_ids):
+    """
+    Суммирует количество ингредиентов по набору рецептов.
+
+    Args:
+        recipe_ids (Iterable[int]): Идентификаторы рецептов.
+
+    Returns:
+        dict: Количество по идентификатору ингредиента.
+    """
+    amounts = defaultdict(int)
+    for ingredient_id, amount in IngredientsInRecipe.objects.filter(
+        recipe_id__in=recipe_ids
+    ).values_list('ingredient_id', 'amount'):
+        amounts[ingredient_id] += amount
+    return amounts
+
+
+@transaction.atomic
+def apply_deltas(user_ids, deltas):
+    """
+    Изменяет суммы в списках покупок пользователей на заданные величины.
+
+    Недостающие строки сначала вставляются с нулевой суммой (INSERT ...
+    ON CONFLICT DO NOTHING), затем все строки обновляются одним UPDATE с
+    CASE по ингредиентам, обнулившиеся удаляются. Параллельная вставка той
+    же строки ждет фиксации первой и пропускается, поэтому одновременные
+    первые добавления не падают на уникальном ограничении и обе величины
+    попадают в сумму.
+
+    Args:
+        user_ids (Iterable[int]): Идентификаторы пользователей.
+        deltas (dict): Изменение количества по идентификатору ингредиента.
+    """
+    user_ids = list(user_ids)
+    deltas = {
+        ingredient_id: delta
+        for ingredient_id, delta in deltas.items() if delta
+    }
+    if not user_ids or not deltas:
+        return
+    ShoppingListItem.objects.bulk_create(
+        [
+            ShoppingListItem(
+                user_id=user_id, ingredient_id=ingredient_id, total=0
+            )
+            for user_id in user_ids
+            for ingredient_id, delta in deltas.items()
+            if delta > 0
+        ],
+        ignore_conflicts=True,
+    )
+    items = ShoppingListItem.objects.filter(
+        user_id__in=user_ids, ingredient_id__in=deltas
+    )
+    items.update(total=models.F('total') + models.Case(
+        *(models.When(ingredient_id=ingredient_id, then=delta)
+          for ingredient_id, delta in deltas.items()),
+        default=0,
+        output_field=models.IntegerField(),
+    ))
+    items.filter(total__lte=0).delete()
+
+
+def add_recipes(user_id, recipe_ids):
+    """
+    Добавляет ингредиенты рецептов в список покупок пользователя.
+    """
+    apply_deltas([user_id], get_recipe_amounts(recipe_ids))
+
+
+def remove_recipes(user_id, recipe_ids):
+    """
+    Вычитает ингредиенты рецептов из списка покупок пользователя.
+    """
+    amounts = get_recipe_amounts(recipe_ids)
+    apply_deltas([user_id], {
+        ingredient_id: -amount for ingredient_id, amount in amounts.items()
+    })
+
+
+def change_recipe(recipe_id, old_amounts, new_amounts):
+    """
+    Переносит изменение ингредиентов рецепта в списки покупок.
+
+    Args:
+        recipe_id (int): Идентификатор рецепта.
+        old_amounts (dict): Количество по ингредиенту до изменения.
+        new_amounts (dict): Количество по ингредиенту после изменения.
+    """
+    deltas = {
+        ingredient_id: (
+            new_amounts.get(ingredient_id, 0)
+            - old_amounts.get(ingredient_id, 0)
+        )
+        for ingredient_id in {*old_amounts, *new_amounts}
+    }
+    if not any(deltas.values()):
+        return
+    apply_deltas(
+        ShoppingCart.objects.filter(
+            recipe_id=recipe_id
+        ).values_list('user_id', flat=True),
+        deltas,
+    )
+
+
+def get_live_totals():
+    """
+    Считает суммы по всем корзинам агрегатом по исходным таблицам.
+
+    Returns:
+        dict: Количество по паре (пользователь, ингредиент).
+    """
+    return {
+        (row['recipe__shopping_cart__user'], row['ingredient']): row['total']
+        for row in IngredientsInRecipe.objects.filter(
+            recipe__shopping_cart__isnull=False
+        ).values(
+            'recipe__shopping_cart__user', 'ingredient'
+        ).annotate(total=models.Sum('amount')).order_by()
+    }
+
+
+def get_stored_totals():
+    return {
+        (user_id, ingredient_id): total
+        for user_id, ingredient_id, total in ShoppingListItem.objects.values_list(
+            'user_id', 'ingredient_id', 'total'
+        )
+    }
+
+
+@transaction.atomic
+def rebuild(batch_size=1000):
+    """
+    Пересоздает таблицу сумм из агрегата по корзинам.
+
+    Returns:
+        int: Количество созданных строк.
+    """
+    totals = get_live_totals()
+    ShoppingListItem.objects.all().delete()
+    ShoppingListItem.objects.bulk_create(
+        (
+            ShoppingListItem(
+                user_id=user_id, ingredient_id=ingredient_id, total=total
+            )
+            for (user_id, ingredient_id), total in totals.items()
+        ),
+        batch_size=batch_size,
+    )
+    return len(totals)
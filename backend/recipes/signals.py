@@ -0,0 +1,237 @@
+from collections import defaultdict
+from contextlib import contextmanager
+
+from django.db import transaction
+from django.db.models.signals import (m2m_changed, post_delete, post_save,
+                                      pre_delete)
+from django.dispatch import Signal, receiver
+from tags.models import Tag
+from users.models import Follow, User
+
+from recipes import (counters, feed, images, membership, pantry, ranking,
+                     search, shopping_list, similarity)
+from recipes.cache import invalidate_recipes
+from recipes.models import (Favorite, Ingredient, IngredientsInRecipe, Recipe,
+                            RecipeSimilarity, ShoppingCart)
+from recipes.versions import bump_version
+
+# Поля пользователя, которые входят в представление рецепта
+AUTHOR_FIELDS = {'email', 'username', 'first_name', 'last_name'}
+
+# Множества членства, которые обновляются при записи в модели связей
+MEMBERSHIP_KINDS = {
+    Favorite: membership.FAVORITES,
+    ShoppingCart: membership.SHOPPING_CART,
+    Follow: membership.FOLLOWS,
+}
+
+# Массовое изменение ингредиентов рецепта (bulk_create и bulk_update не
+# отправляют post_save). Аргументы: recipe_id, old_amounts, new_amounts.
+ingredients_changed = Signal()
+
+# Рецепты добавлены в избранное или корзину либо удалены из них, в том
+# числе массово одним запросом (sender: Favorite или ShoppingCart).
+# Аргументы: user_id, entries (пары рецепт и время добавления), delta.
+recipes_linked = Signal()
+
+
+def get_amounts_by_recipe(recipe_ids):
+    """
+    Количество ингредиентов по рецептам.
+
+    Returns:
+        dict: Словари {ингредиент: количество} по идентификатору рецепта.
+    """
+    amounts = defaultdict(dict)
+    for recipe_id, ingredient_id, amount in IngredientsInRecipe.objects.filter(
+        recipe_id__in=recipe_ids
+    ).values_list('recipe_id', 'ingredient_id', 'amount'):
+        amounts[recipe_id][ingredient_id] = amount
+    return amounts
+
+
+@contextmanager
+def reporting_ingredient_changes(recipe_ids):
+    """
+    Отправляет ingredients_changed после построчных изменений состава.
+
+    Суммы списков покупок поддерживаются только этим сигналом, поэтому
+    правки строк IngredientsInRecipe через save() и delete() (например,
+    в админке) оборачиваются в этот блок: состав рецептов читается до и
+    после, и для изменившихся рецептов отправляется сигнал.
+
+    Args:
+        recipe_ids (Iterable[int]): Рецепты, состав которых меняется.
+    """
+    recipe_ids = set(recipe_ids)
+    old = get_amounts_by_recipe(recipe_ids)
+    yield
+    new = get_amounts_by_recipe(recipe_ids)
+    for recipe_id in recipe_ids:
+        if old.get(recipe_id, {}) != new.get(recipe_id, {}):
+            ingredients_changed.send(
+                sender=Recipe,
+                recipe_id=recipe_id,
+                old_amounts=old.get(recipe_id, {}),
+                new_amounts=new.get(recipe_id, {}),
+            )
+
+
+@receiver((post_save, post_delete), sender=Recipe)
+def recipe_changed(sender, instance, created=False, **kwargs):
+    invalidate_recipes([instance.id])
+    if created:
+        feed.schedule_fan_out(instance)
+    if kwargs['signal'] is post_save:
+        search.recipes_changed([instance.id])
+        if instance.image and instance.image_variants.get(
+            images.ORIGINAL
+        ) != instance.image.name:
+            images.schedule_variants(instance.id)
+    else:
+        bump_version('recipes-search')
+
+
+@receiver((post_save, post_delete), sender=IngredientsInRecipe)
+def recipe_ingredient_changed(sender, instance, **kwargs):
+    invalidate_recipes([instance.recipe_id])
+    search.recipes_changed([instance.recipe_id])
+    similarity.mark_stale([instance.recipe_id])
+    pantry.recipes_changed([instance.recipe_id])
+
+
+@receiver(ingredients_changed, sender=Recipe)
+def recipe_ingredients_replaced(sender, recipe_id, old_amounts, new_amounts,
+                                **kwargs):
+    invalidate_recipes([recipe_id])
+    search.recipes_changed([recipe_id])
+    similarity.mark_stale([recipe_id])
+    pantry.recipes_changed([recipe_id])
+    shopping_list.change_recipe(recipe_id, old_amounts, new_amounts)
+
+
+@receiver(m2m_changed, sender=Recipe.tags.through)
+@receiver(m2m_changed, sender=Recipe.ingredients.through)
+def recipe_relations_changed(sender, instance, action, reverse, pk_set,
+                             **kwargs):
+    if action not in ('post_add', 'post_remove', 'pre_clear'):
+        return
+    if not reverse:
+        recipe_ids = [instance.id]
+    elif pk_set:
+        recipe_ids = list(pk_set)
+    else:
+        recipe_ids = list(sender.objects.filter(
+            **{instance._meta.model_name: instance}
+        ).values_list('recipe_id', flat=True))
+    invalidate_recipes(recipe_ids)
+    similarity.mark_stale(recipe_ids)
+    if sender is IngredientsInRecipe:
+        search.recipes_changed(recipe_ids)
+        pantry.recipes_changed(recipe_ids)
+
+
+@receiver(post_save, sender=Tag)
+@receiver(pre_delete, sender=Tag)
+def tag_changed(sender, instance, **kwargs):
+    bump_version('tags')
+    invalidate_recipes(instance.recipes.values_list('id', flat=True))
+
+
+@receiver((post_save, post_delete), sender=Ingredient)
+def ingredient_changed(sender, instance, **kwargs):
+    bump_version('ingredients')
+    recipe_ids = list(
+        instance.ingredients_list.values_list('recipe_id', flat=True)
+    )
+    invalidate_recipes(recipe_ids)
+    search.recipes_changed(recipe_ids)
+
+
+@receiver(post_save, sender=User)
+def author_changed(sender, instance, update_fields=None, **kwargs):
+    if update_fields is not None and not AUTHOR_FIELDS & set(update_fields):
+        return
+    invalidate_recipes(instance.recipes.values_list('id', flat=True))
+
+
+@receiver((post_save, post_delete), sender=Follow)
+def membership_changed(sender, instance, created=False, **kwargs):
+    if kwargs['signal'] is post_save and not created:
+        return
+    kind = MEMBERSHIP_KINDS[sender]
+    object_id = getattr(instance, membership.SOURCES[kind][1])
+    changes = {'added' if created else 'removed': (object_id,)}
+    transaction.on_commit(lambda: membership.update_members(
+        instance.user_id, kind, **changes
+    ))
+
+
+@receiver((post_save, post_delete), sender=Follow)
+@receiver((post_save, post_delete), sender=Recipe)
+def counted_changed(sender, instance, created=False, **kwargs):
+    if kwargs['signal'] is post_save and not created:
+        return
+    _, link, _ = counters.COUNTERS[sender]
+    counters.change_counters(
+        sender, [getattr(instance, link)], 1 if created else -1
+    )
+
+
+@receiver(post_save, sender=Favorite)
+@receiver(post_save, sender=ShoppingCart)
+def recipe_link_saved(sender, instance, created, **kwargs):
+    if created:
+        recipes_linked.send(
+            sender=sender,
+            user_id=instance.user_id,
+            entries=[(instance.recipe_id, instance.added)],
+            delta=1,
+        )
+
+
+# pre_delete, а не post_delete: при удалении рецепта его ингредиенты
+# удаляются тем же каскадом, а список покупок вычитает их количества
+@receiver(pre_delete, sender=Favorite)
+@receiver(pre_delete, sender=ShoppingCart)
+def recipe_link_deleted(sender, instance, **kwargs):
+    recipes_linked.send(
+        sender=sender,
+        user_id=instance.user_id,
+        entries=[(instance.recipe_id, instance.added)],
+        delta=-1,
+    )
+
+
+@receiver(recipes_linked, sender=Favorite)
+@receiver(recipes_linked, sender=ShoppingCart)
+def recipe_links_changed(sender, user_id, entries, delta, **kwargs):
+    recipe_ids = [recipe_id for recipe_id, _ in entries]
+    if not recipe_ids:
+        return
+    counters.change_counters(sender, recipe_ids, delta)
+    ranking.record_events(sender, entries, delta)
+    changes = {'added' if delta > 0 else 'removed': recipe_ids}
+    transaction.on_commit(lambda: membership.update_members(
+        user_id, MEMBERSHIP_KINDS[sender], **changes
+    ))
+    if sender is ShoppingCart:
+        if delta > 0:
+            shopping_list.add_recipes(user_id, recipe_ids)
+        else:
+            shopping_list.remove_recipes(user_id, recipe_ids)
+
+
+@receiver((post_save, post_delete), sender=Follow)
+def follow_changed(sender, instance, created=False, **kwargs):
+    if kwargs['signal'] is post_delete:
+        feed.prune(instance.user_id, instance.author_id)
+    elif created:
+        feed.backfill(instance.user_id, instance.author_id)
+
+
+@receiver(pre_delete, sender=Recipe)
+def recipe_deleted(sender, instance, **kwargs):
+    similarity.mark_stale(RecipeSimilarity.objects.filter(
+        similar_id=instance.id
+    ).values_list('recipe_id', flat=True))
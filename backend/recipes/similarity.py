@@ -0,0 +1,205 @@
+import heapq
+from collections import Counter, defaultdict
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Count, Min
+
+from recipes.models import IngredientsInRecipe, Recipe, RecipeSimilarity
+from recipes.versions import bump_version
+
+# Метка версии списков похожих рецептов (для условных запросов)
+SIMILARITY_SCOPE = 'recipe-similarity'
+
+
+def mark_stale(recipe_ids):
+    """
+    Помечает рецепты для пересчета похожих при следующем запуске.
+    """
+    Recipe.objects.filter(id__in=recipe_ids, similar_stale=False).update(
+        similar_stale=True
+    )
+
+
+def load_sets(through, field):
+    """
+    Множества связанных объектов по рецептам (ингредиенты или теги).
+    """
+    sets = defaultdict(set)
+    for recipe_id, object_id in through.objects.values_list(
+        'recipe_id', field
+    ).iterator():
+        sets[recipe_id].add(object_id)
+    return sets
+
+
+def jaccard(common, first, second):
+    return common / (first + second - common) if common else 0.0
+
+
+class SimilarityIndex:
+    """
+    Разреженные векторы рецептов и обратный индекс по ингредиентам.
+
+    Кандидаты для рецепта - только рецепты хотя бы с одним общим
+    ингредиентом: пересечения считаются проходом по спискам обратного
+    индекса, без сравнения со всеми рецептами.
+
+    Атрибуты:
+        ingredients (dict): Множества ингредиентов по рецептам.
+        tags (dict): Множества тегов по рецептам.
+        postings (dict): Рецепты по ингредиенту.
+    """
+
+    def __init__(self, ingredients, tags):
+        self.ingredients = ingredients
+        self.tags = tags
+        self.postings = defaultdict(list)
+        for recipe_id, ingredient_ids in ingredients.items():
+            for ingredient_id in ingredient_ids:
+                self.postings[ingredient_id].append(recipe_id)
+
+    @classmethod
+    def load(cls):
+        return cls(
+            load_sets(IngredientsInRecipe, 'ingredient_id'),
+            load_sets(Recipe.tags.through, 'tag_id'),
+        )
+
+    def score(self, recipe_id, other_id, common):
+        """
+        Сходство по ингредиентам (Жаккар) с добавкой за общие теги.
+        """
+        tags = self.tags.get(recipe_id, set())
+        other_tags = self.tags.get(other_id, set())
+        tag_score = jaccard(
+            len(tags & other_tags), len(tags), len(other_tags)
+        )
+        ingredient_score = jaccard(
+            common,
+            len(self.ingredients[recipe_id]),
+            len(self.ingredients[other_id]),
+        )
+        boost = settings.SIMILAR_TAG_BOOST
+        return (ingredient_score + boost * tag_score) / (1 + boost)
+
+    def candidates(self, recipe_id):
+        """
+        Сходство со всеми рецептами, у которых есть общие ингредиенты.
+
+        Returns:
+            dict: Сходство по идентификатору рецепта.
+        """
+        common = Counter()
+        for ingredient_id in self.ingredients.get(recipe_id, ()):
+            common.update(self.postings[ingredient_id])
+        common.pop(recipe_id, None)
+        return {
+            other_id: self.score(recipe_id, other_id, count)
+            for other_id, count in common.items()
+        }
+
+    def neighbours(self, recipe_id, count):
+        """
+        Ближайшие рецепты по убыванию сходства.
+
+        Returns:
+            list: Пары (идентификатор, сходство).
+        """
+        scores = self.candidates(recipe_id)
+        return heapq.nlargest(
+            count, scores.items(), key=lambda item: (item[1], -item[0])
+        )
+
+
+def find_affected(index, stale_ids, count):
+    """
+    Рецепты, чьи списки могут измениться из-за измененных рецептов.
+
+    Кроме самих измененных, это рецепты, у которых они уже в списке
+    (сходство могло упасть), и рецепты, в список которых они теперь
+    проходят по сходству.
+    """
+    affected = set(stale_ids)
+    affected.update(RecipeSimilarity.objects.filter(
+        similar_id__in=stale_ids
+    ).values_list('recipe_id', flat=True))
+    thresholds = {
+        row['recipe_id']: (row['lowest'], row['size'])
+        for row in RecipeSimilarity.objects.values('recipe_id').annotate(
+            lowest=Min('score'), size=Count('id')
+        ).order_by()
+    }
+    for recipe_id in stale_ids:
+        for other_id, score in index.candidates(recipe_id).items():
+            lowest, size = thresholds.get(other_id, (0.0, 0))
+            if size < count or score >= lowest:
+                affected.add(other_id)
+    return affected
+
+
+def save_neighbours(index, recipe_ids, count):
+    """
+    Заменяет сохраненные списки похожих для переданных рецептов.
+    """
+    with transaction.atomic():
+        RecipeSimilarity.objects.filter(recipe_id__in=recipe_ids).delete()
+        RecipeSimilarity.objects.bulk_create(
+            [
+                RecipeSimilarity(
+                    recipe_id=recipe_id, similar_id=similar_id, score=score
+                )
+                for recipe_id in recipe_ids
+                for similar_id, score in index.neighbours(recipe_id, count)
+            ],
+            batch_size=1000,
+        )
+
+
+def update_similar(rebuild=False):
+    """
+    Пересчитывает похожие рецепты для измененных рецептов.
+
+    Флаги сбрасываются до расчета: если рецепт изменится во время
+    пересчета, он снова будет помечен и обработан следующим запуском.
+
+    Args:
+        rebuild (bool): Пересчитать списки всех рецептов.
+
+    Returns:
+        int: Число рецептов с обновленными списками.
+    """
+    recipes = Recipe.objects.all()
+    if not rebuild:
+        recipes = recipes.filter(similar_stale=True)
+    stale_ids = list(recipes.values_list('id', flat=True))
+    if not stale_ids:
+        return 0
+    Recipe.objects.filter(id__in=stale_ids).update(similar_stale=False)
+    try:
+        index = SimilarityIndex.load()
+        count = settings.SIMILAR_RECIPES_COUNT
+        if rebuild:
+            affected = set(stale_ids)
+        else:
+            affected = find_affected(index, stale_ids, count)
+        existing = set(Recipe.objects.filter(
+            id__in=affected
+        ).values_list('id', flat=True))
+        save_neighbours(index, existing, count)
+    except Exception:
+        mark_stale(stale_ids)
+        raise
+    bump_version(SIMILARITY_SCOPE)
+    return len(existing)
+
+
+def get_similar_ids(recipe_id):
+    """
+    Идентификаторы похожих рецептов по убыванию сходства.
+    """
+    return list(RecipeSimilarity.objects.filter(
+        recipe_id=recipe_id
+    ).order_by('-score', 'similar_id').values_list(
+        'similar_id', flat=True
+    )[:settings.SIMILAR_RECIPES_COUNT])
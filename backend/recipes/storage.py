@@ -0,0 +1,43 @@
+import hashlib
+import os
+
+from django.core.files import File
+from django.core.files.storage import FileSystemStorage
+from django.utils.deconstruct import deconstructible
+
+
+@deconstructible
+class ContentAddressedStorage(FileSystemStorage):
+    """
+    Файловое хранилище, в котором имя файла - хэш его содержимого.
+
+    Одинаковые загрузки получают одно имя: если файл уже есть на диске,
+    запись пропускается. Один файл может принадлежать нескольким
+    рецептам, поэтому хранилище не предназначено для удаления файлов
+    вместе с записями.
+    """
+
+    def hashed_name(self, name, content):
+        """
+        Возвращает имя файла по SHA-256 содержимого.
+
+        Каталог и расширение берутся из исходного имени.
+        """
+        digest = hashlib.sha256()
+        content.seek(0)
+        for chunk in content.chunks():
+            digest.update(chunk)
+        content.seek(0)
+        directory, filename = os.path.split(name)
+        extension = os.path.splitext(filename)[1].lower()
+        return os.path.join(directory, digest.hexdigest() + extension)
+
+    def save(self, name, content, max_length=None):
+        if name is None:
+            name = content.name
+        if not hasattr(content, 'chunks'):
+            content = File(content, name)
+        name = self.hashed_name(name, content)
+        if self.exists(name):
+            return name
+        return super().save(name, content, max_length=max_length)
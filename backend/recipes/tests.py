@@ -0,0 +1,507 @@
+import base64
+import io
+import os
+import shutil
+import tempfile
+
+from django.core.cache import cache
+from django.db import connection
+from django.test import TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from PIL import Image
+from rest_framework.renderers import JSONRenderer
+from rest_framework.test import APIClient
+from tags.models import Tag
+from users.models import Follow, User
+
+from recipes import (bulk, feed, images, membership, pantry, ranking,
+                     similarity)
+from recipes.importer import import_file
+from recipes.models import (Favorite, Ingredient, IngredientsInRecipe, Recipe,
+                            RecipeEvent, ShoppingCart, ShoppingListItem)
+from recipes.payloads import build_recipe_payloads, serialize_recipe_payloads
+
+MEDIA_ROOT = tempfile.mkdtemp()
+
+
+def make_image():
+    """
+    Картинка PNG в виде data URI, как ее присылает фронтенд.
+    """
+    buffer = io.BytesIO()
+    Image.new('RGB', (40, 30), (200, 10, 10)).save(buffer, 'PNG')
+    encoded = base64.b64encode(buffer.getvalue()).decode()
+    return f'data:image/png;base64,{encoded}'
+
+
+@override_settings(MEDIA_ROOT=MEDIA_ROOT, IMAGE_WORKERS=0)
+class RecipeTestCase(TestCase):
+    """
+    Пользователи, теги, ингредиенты и рецепты трех авторов.
+    """
+
+    @classmethod
+    def tearDownClass(cls):
+        super().tearDownClass()
+        shutil.rmtree(MEDIA_ROOT, ignore_errors=True)
+
+    def setUp(self):
+        cache.clear()
+        membership.reset_backend()
+        self.user = User.objects.create_user(
+            email='user@example.com', username='user', password='pass12345',
+            first_name='Иван', last_name='Иванов',
+        )
+        self.authors = [
+            User.objects.create_user(
+                email=f'author{i}@example.com', username=f'author{i}',
+                password='pass12345', first_name='Петр', last_name='Петров',
+            )
+            for i in range(3)
+        ]
+        self.tags = [
+            Tag.objects.create(name=f'Тег {i}', color=f'#00000{i}', slug=f'tag{i}')
+            for i in range(3)
+        ]
+        self.ingredients = [
+            Ingredient.objects.create(name=f'Продукт {i}', measurement_unit='г')
+            for i in range(5)
+        ]
+        self.recipes = [
+            self.make_recipe(author, f'Рецепт {i}')
+            for i, author in enumerate(self.authors * 3)
+        ]
+        for author in self.authors:
+            Follow.objects.create(user=self.user, author=author)
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def make_recipe(self, author, name):
+        recipe = Recipe.objects.create(
+            author=author, name=name, text='Описание', cooking_time=5,
+            image='recipes/image.png',
+        )
+        recipe.tags.set(self.tags[:2])
+        IngredientsInRecipe.objects.bulk_create([
+            IngredientsInRecipe(recipe=recipe, ingredient=ingredient, amount=10)
+            for ingredient in self.ingredients[:3]
+        ])
+        return recipe
+
+
+class RecipeQueriesTest(RecipeTestCase):
+    """
+    Число запросов к базе на основных эндпоинтах рецептов.
+    """
+
+    def test_list_with_warm_cache(self):
+        self.client.get('/api/recipes/?limit=20')
+        with self.assertNumQueries(2):
+            response = self.client.get('/api/recipes/?limit=20')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(len(response.data['results']), len(self.recipes))
+
+    def test_detail(self):
+        recipe = self.recipes[0]
+        self.client.get(f'/api/recipes/{self.recipes[1].id}/')
+        with self.assertNumQueries(3):
+            response = self.client.get(f'/api/recipes/{recipe.id}/')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(len(response.data['ingredients']), 3)
+
+    def test_subscriptions(self):
+        with self.assertNumQueries(3):
+            response = self.client.get('/api/users/subscriptions/')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(len(response.data['results']), len(self.authors))
+
+    def test_create(self):
+        self.client.get('/api/recipes/')
+        data = {
+            'name': 'Новый рецепт',
+            'text': 'Описание',
+            'cooking_time': 10,
+            'image': make_image(),
+            'tags': [tag.id for tag in self.tags],
+            'ingredients': [
+                {'id': ingredient.id, 'amount': 5}
+                for ingredient in self.ingredients
+            ],
+        }
+        # Проверка: теги и ингредиенты (2). Сохранение в транзакции
+        # (SAVEPOINT и RELEASE, 2): INSERT рецепта, счетчик автора, теги
+        # (текущие, существующие связи, INSERT и пометка похожих, 4),
+        # ингредиенты (INSERT, пометка похожих, журнал продуктов, 3) и
+        # список покупок (SAVEPOINT, корзины рецепта, RELEASE, 3). Ответ:
+        # рецепт с автором, теги и ингредиенты (3). Рассылка по лентам,
+        # поисковый вектор и варианты изображения идут после фиксации
+        with self.assertNumQueries(19):
+            response = self.client.post('/api/recipes/', data, format='json')
+        self.assertEqual(response.status_code, 201, response.data)
+        self.assertEqual(len(response.data['ingredients']), 5)
+
+
+class RecipePayloadsTest(RecipeTestCase):
+    """
+    build_recipe_payloads отдает тот же JSON, что и RecipeSerializer.
+    """
+
+    def test_payloads_match_serializer(self):
+        recipe = self.recipes[0]
+        recipe.image_variants = {
+            images.ORIGINAL: 'recipes/image.png',
+            'thumbnail': 'recipes/variants/thumbnail.webp',
+        }
+        recipe.save(update_fields=['image_variants'])
+        self.recipes[1].tags.clear()
+        self.recipes[2].ingredients.clear()
+        self.recipes[3].image = ''
+        self.recipes[3].save()
+        recipe_ids = [recipe.id for recipe in self.recipes]
+        expected = serialize_recipe_payloads(recipe_ids)
+        actual = build_recipe_payloads(recipe_ids)
+        self.assertEqual(sorted(actual), sorted(expected))
+        renderer = JSONRenderer()
+        for recipe_id in recipe_ids:
+            with self.subTest(recipe=recipe_id):
+                self.assertEqual(
+                    renderer.render(actual[recipe_id]),
+                    renderer.render(expected[recipe_id]),
+                )
+
+
+class RecipeKeysetPaginationTest(RecipeTestCase):
+    """
+    Переход по курсорам next и previous и отказ курсора с поиском.
+    """
+
+    def test_next_and_previous(self):
+        expected = [
+            recipe.id for recipe in sorted(
+                self.recipes, key=lambda recipe: (recipe.pub_date, recipe.id),
+                reverse=True,
+            )
+        ]
+        response = self.client.get('/api/recipes/?cursor=&limit=4')
+        self.assertEqual(response.status_code, 200)
+        first = [recipe['id'] for recipe in response.data['results']]
+        self.assertIsNone(response.data['previous'])
+        response = self.client.get(response.data['next'])
+        second = [recipe['id'] for recipe in response.data['results']]
+        response = self.client.get(response.data['next'])
+        third = [recipe['id'] for recipe in response.data['results']]
+        self.assertEqual(first + second + third, expected)
+        self.assertIsNone(response.data['next'])
+        response = self.client.get(response.data['previous'])
+        self.assertEqual(
+            [recipe['id'] for recipe in response.data['results']], second
+        )
+
+    def test_cursor_with_search_is_rejected(self):
+        response = self.client.get('/api/recipes/?cursor=&search=Рецепт')
+        self.assertEqual(response.status_code, 400)
+
+
+class IngredientsAdminTest(RecipeTestCase):
+    """
+    Правки состава в админке меняют суммы в списке покупок.
+    """
+
+    def setUp(self):
+        super().setUp()
+        self.admin = User.objects.create_superuser(
+            email='admin@example.com', username='admin', password='pass12345',
+            first_name='Админ', last_name='Админов',
+        )
+        self.client.force_authenticate(self.admin)
+        self.client.force_login(self.admin)
+        self.recipe = self.recipes[0]
+        ShoppingCart.objects.create(user=self.user, recipe=self.recipe)
+
+    def get_totals(self):
+        return dict(
+            ShoppingListItem.objects.filter(user=self.user)
+            .values_list('ingredient_id', 'total')
+        )
+
+    def test_change_and_delete(self):
+        row = IngredientsInRecipe.objects.get(
+            recipe=self.recipe, ingredient=self.ingredients[0]
+        )
+        url = f'/admin/recipes/ingredientsinrecipe/{row.id}/'
+        with self.captureOnCommitCallbacks(execute=True):
+            response = self.client.post(f'{url}change/', {
+                'recipe': self.recipe.id,
+                'ingredient': self.ingredients[0].id,
+                'amount': 25,
+            })
+        self.assertEqual(response.status_code, 302)
+        self.assertEqual(self.get_totals()[self.ingredients[0].id], 25)
+        with self.captureOnCommitCallbacks(execute=True):
+            response = self.client.post(f'{url}delete/', {'post': 'yes'})
+        self.assertEqual(response.status_code, 302)
+        self.assertNotIn(self.ingredients[0].id, self.get_totals())
+
+
+class RecipeUpdateQueriesTest(RecipeTestCase):
+    """
+    Число запросов при замене состава не зависит от числа удаленных строк.
+    """
+
+    def setUp(self):
+        super().setUp()
+        self.ingredients += [
+            Ingredient.objects.create(name=f'Добавка {i}', measurement_unit='г')
+            for i in range(20)
+        ]
+        self.client.force_authenticate(self.authors[0])
+
+    def patch_recipe(self, size):
+        recipe = self.make_recipe(self.authors[0], f'Рецепт на {size}')
+        IngredientsInRecipe.objects.bulk_create([
+            IngredientsInRecipe(recipe=recipe, ingredient=ingredient, amount=10)
+            for ingredient in self.ingredients[3:size]
+        ])
+        data = {
+            'name': recipe.name,
+            'text': recipe.text,
+            'cooking_time': recipe.cooking_time,
+            'tags': [tag.id for tag in self.tags[:2]],
+            'ingredients': [
+                {'id': ingredient.id, 'amount': 10}
+                for ingredient in self.ingredients[:5]
+            ],
+        }
+        with CaptureQueriesContext(connection) as context:
+            response = self.client.patch(
+                f'/api/recipes/{recipe.id}/', data, format='json'
+            )
+        self.assertEqual(response.status_code, 200, response.data)
+        self.assertEqual(len(response.data['ingredients']), 5)
+        return len(context.captured_queries)
+
+    def test_removed_rows(self):
+        self.client.get('/api/recipes/')
+        self.assertEqual(self.patch_recipe(6), self.patch_recipe(25))
+
+
+class BulkRecipesTest(RecipeTestCase):
+    """
+    Массовое добавление и удаление рецептов одним запросом с RETURNING.
+    """
+
+    def get_counts(self, field, recipes):
+        counts = dict(Recipe.objects.values_list('id', field))
+        return [counts[recipe.id] for recipe in recipes]
+
+    def get_totals(self):
+        return dict(
+            ShoppingListItem.objects.filter(user=self.user)
+            .values_list('ingredient_id', 'total')
+        )
+
+    def test_repeated_add_is_idempotent(self):
+        recipes = self.recipes[:3]
+        recipe_ids = [recipe.id for recipe in recipes]
+        with self.captureOnCommitCallbacks(execute=True):
+            first = bulk.add_recipes(ShoppingCart, self.user, recipe_ids)
+            second = bulk.add_recipes(ShoppingCart, self.user, recipe_ids)
+        self.assertEqual(first, recipe_ids)
+        self.assertEqual(second, [])
+        self.assertEqual(self.get_counts('in_carts_count', recipes), [1] * 3)
+        self.assertEqual(RecipeEvent.objects.count(), 3)
+        self.assertEqual(
+            self.get_totals(),
+            {ingredient.id: 30 for ingredient in self.ingredients[:3]},
+        )
+        self.assertEqual(
+            membership.get_members(self.user, membership.SHOPPING_CART),
+            frozenset(recipe_ids),
+        )
+
+    def test_side_effects_only_for_returned_rows(self):
+        recipes = self.recipes[:2]
+        ShoppingCart.objects.create(user=self.user, recipe=recipes[0])
+        added = bulk.add_recipes(
+            ShoppingCart, self.user, [recipe.id for recipe in recipes]
+        )
+        self.assertEqual(added, [recipes[1].id])
+        self.assertEqual(self.get_counts('in_carts_count', recipes), [1, 1])
+        self.assertEqual(RecipeEvent.objects.count(), 2)
+        self.assertEqual(
+            self.get_totals(),
+            {ingredient.id: 20 for ingredient in self.ingredients[:3]},
+        )
+
+    def test_remove(self):
+        recipes = self.recipes[:3]
+        recipe_ids = [recipe.id for recipe in recipes]
+        with self.captureOnCommitCallbacks(execute=True):
+            bulk.add_recipes(Favorite, self.user, recipe_ids)
+            removed = bulk.remove_recipes(
+                Favorite, self.user, [recipe_ids[0], self.recipes[5].id]
+            )
+        self.assertEqual(removed, [recipe_ids[0]])
+        self.assertEqual(self.get_counts('favorites_count', recipes), [0, 1, 1])
+        self.assertEqual(RecipeEvent.objects.filter(delta=-1).count(), 1)
+        self.assertEqual(
+            membership.get_members(self.user, membership.FAVORITES),
+            frozenset(recipe_ids[1:]),
+        )
+
+
+class FeedTest(RecipeTestCase):
+    """
+    Лента подписок и ее ETag.
+    """
+
+    def test_etag_changes_after_fan_out(self):
+        # Рассылка по лентам отложена до фиксации и еще не выполнена
+        recipe = self.make_recipe(self.authors[0], 'Новый рецепт')
+        response = self.client.get('/api/recipes/feed/')
+        self.assertEqual(response.status_code, 200)
+        self.assertNotIn(
+            recipe.id, [item['id'] for item in response.data['results']]
+        )
+        with self.captureOnCommitCallbacks(execute=True):
+            feed.fan_out(recipe.id, recipe.author_id, recipe.pub_date)
+        response = self.client.get(
+            '/api/recipes/feed/', HTTP_IF_NONE_MATCH=response['ETag']
+        )
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data['results'][0]['id'], recipe.id)
+
+
+class ConditionalGetTest(RecipeTestCase):
+    """
+    Ответ 304 по ETag до изменения данных и 200 после него.
+    """
+
+    def test_not_modified_until_recipe_changes(self):
+        response = self.client.get('/api/recipes/?limit=20')
+        etag = response['ETag']
+        response = self.client.get(
+            '/api/recipes/?limit=20', HTTP_IF_NONE_MATCH=etag
+        )
+        self.assertEqual(response.status_code, 304)
+        recipe = self.recipes[0]
+        with self.captureOnCommitCallbacks(execute=True):
+            recipe.tags.set(self.tags[2:])
+        response = self.client.get(
+            '/api/recipes/?limit=20', HTTP_IF_NONE_MATCH=etag
+        )
+        self.assertEqual(response.status_code, 200)
+        tags = {
+            item['id']: [tag['id'] for tag in item['tags']]
+            for item in response.data['results']
+        }
+        self.assertEqual(tags[recipe.id], [self.tags[2].id])
+
+
+class RankingTest(RecipeTestCase):
+    """
+    Сортировка по популярности и трендам после пересчета рейтингов.
+    """
+
+    def test_ordering_by_scores(self):
+        other = User.objects.create_user(
+            email='other@example.com', username='other', password='pass12345',
+            first_name='Анна', last_name='Сидорова',
+        )
+        first, second = self.recipes[3], self.recipes[6]
+        bulk.add_recipes(Favorite, self.user, [first.id, second.id])
+        bulk.add_recipes(Favorite, other, [second.id])
+        bulk.add_recipes(ShoppingCart, other, [first.id, second.id])
+        with self.captureOnCommitCallbacks(execute=True):
+            ranking.update_scores()
+        for ordering in ('popular', 'trending'):
+            with self.subTest(ordering=ordering):
+                response = self.client.get(
+                    f'/api/recipes/?ordering={ordering}&limit=20'
+                )
+                self.assertEqual(response.status_code, 200)
+                self.assertEqual(
+                    [item['id'] for item in response.data['results'][:2]],
+                    [second.id, first.id],
+                )
+
+
+class PantryTest(RecipeTestCase):
+    """
+    Подбор рецептов по имеющимся продуктам.
+    """
+
+    def test_complete_recipes_first(self):
+        recipe = self.make_recipe(self.authors[0], 'Из двух продуктов')
+        recipe.ingredients.set(
+            self.ingredients[3:], through_defaults={'amount': 10}
+        )
+        pantry.rebuild()
+        available = self.ingredients[:2] + self.ingredients[3:]
+        response = self.client.get('/api/recipes/pantry/', {
+            'ingredients': ','.join(str(item.id) for item in available)
+        })
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data[0]['id'], recipe.id)
+        self.assertEqual(response.data[0]['missing_ingredients'], [])
+        missing = self.ingredients[2]
+        for item in response.data[1:]:
+            self.assertEqual(
+                [ingredient['id'] for ingredient in item['missing_ingredients']],
+                [missing.id],
+            )
+
+    def test_ingredients_required(self):
+        response = self.client.get('/api/recipes/pantry/')
+        self.assertEqual(response.status_code, 400)
+
+
+class SimilarityTest(RecipeTestCase):
+    """
+    Похожие рецепты по общим ингредиентам и тегам.
+    """
+
+    def test_similar_recipes(self):
+        unrelated = self.make_recipe(self.authors[0], 'Другой рецепт')
+        unrelated.tags.set(self.tags[2:])
+        unrelated.ingredients.set(
+            self.ingredients[3:], through_defaults={'amount': 10}
+        )
+        with self.captureOnCommitCallbacks(execute=True):
+            similarity.update_similar(rebuild=True)
+        recipe = self.recipes[0]
+        response = self.client.get(f'/api/recipes/{recipe.id}/similar/')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(
+            {item['id'] for item in response.data},
+            {other.id for other in self.recipes[1:]},
+        )
+        response = self.client.get(f'/api/recipes/{unrelated.id}/similar/')
+        self.assertEqual(response.data, [])
+
+
+class ImporterTest(RecipeTestCase):
+    """
+    Идемпотентный импорт справочника ингредиентов.
+    """
+
+    def test_import_is_idempotent(self):
+        directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, directory)
+        path = os.path.join(directory, 'ingredients.csv')
+        with open(path, 'w', encoding='utf8') as file:
+            file.write('Мука,г\nСахар,г\nМука,г\n,г\nПродукт 0,г\n')
+        self.client.get('/api/ingredients/')
+        with self.captureOnCommitCallbacks(execute=True):
+            stats = import_file('ingredients', path)
+        self.assertEqual(
+            (stats.read, stats.inserted, stats.duplicates, stats.invalid,
+             stats.conflicts),
+            (5, 2, 1, 1, 1),
+        )
+        response = self.client.get('/api/ingredients/')
+        names = {item['name'] for item in response.data}
+        self.assertTrue({'Мука', 'Сахар'} <= names)
+        stats = import_file('ingredients', path)
+        self.assertEqual((stats.inserted, stats.conflicts), (0, 3))
+        self.assertEqual(Ingredient.objects.filter(name='Мука').count(), 1)
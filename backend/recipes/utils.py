@@ -1,18 +1,151 @@
+import csv
+import hashlib
+import io
+import os
+
 from django.conf import settings
-from django.http import HttpResponse
+from django.core.cache import cache
+from django.http import StreamingHttpResponse
+from reportlab.lib.pagesizes import A4
+from reportlab.pdfbase import pdfmetrics
+from reportlab.pdfbase.ttfonts import TTFont
+from reportlab.pdfgen import canvas
+
+FOOTER = 'FoodGram Service'
+PDF_FONT_NAME = 'ShoppingListFont'
+
+
+class Echo:
+    """
+    Псевдо-буфер для csv.writer: возвращает строку вместо записи.
+    """
+
+    def write(self, value):
+        return value
+
+
+def format_line(ing):
+    name = ing['ingredient__name']
+    measurement_unit = ing['ingredient__measurement_unit']
+    amount = ing['ingredient_total']
+    return f'{name} ({measurement_unit}) - {amount}'
 
 
 def convert_txt(shop_list):
-    file_name = settings.SHOPPING_CART_FILE_NAME
-    lines = []
     for ing in shop_list:
-        name = ing['ingredient__name']
-        measurement_unit = ing['ingredient__measurement_unit']
-        amount = ing['ingredient_total']
-        lines.append(f'{name} ({measurement_unit}) - {amount}')
-    lines.append('\nFoodGram Service')
-    content = '\n'.join(lines)
-    content_type = 'text/plain,charset=utf8'
-    response = HttpResponse(content, content_type=content_type)
-    response['Content-Disposition'] = f'attachment; filename={file_name}'
+        yield f'{format_line(ing)}\n'.encode()
+    yield f'\n{FOOTER}'.encode()
+
+
+def convert_csv(shop_list):
+    writer = csv.writer(Echo())
+    yield writer.writerow(
+        ('Ингредиент', 'Единица измерения', 'Количество')
+    ).encode()
+    for ing in shop_list:
+        yield writer.writerow((
+            ing['ingredient__name'],
+            ing['ingredient__measurement_unit'],
+            ing['ingredient_total'],
+        )).encode()
+
+
+def get_pdf_font():
+    if PDF_FONT_NAME in pdfmetrics.getRegisteredFontNames():
+        return PDF_FONT_NAME
+    if not os.path.exists(settings.SHOPPING_CART_PDF_FONT):
+        return 'Helvetica'
+    pdfmetrics.registerFont(
+        TTFont(PDF_FONT_NAME, settings.SHOPPING_CART_PDF_FONT)
+    )
+    return PDF_FONT_NAME
+
+
+def convert_pdf(shop_list, chunk_size=64 * 1024):
+    buffer = io.BytesIO()
+    font = get_pdf_font()
+    pdf = canvas.Canvas(buffer, pagesize=A4)
+    width, height = A4
+    margin, line_height = 50, 20
+    y = height - margin
+    pdf.setFont(font, 16)
+    pdf.drawString(margin, y, 'Список покупок')
+    y -= line_height * 2
+    pdf.setFont(font, 12)
+    for ing in shop_list:
+        if y < margin:
+            pdf.showPage()
+            pdf.setFont(font, 12)
+            y = height - margin
+        pdf.drawString(margin, y, f'• {format_line(ing)}')
+        y -= line_height
+    pdf.drawString(margin, margin / 2, FOOTER)
+    pdf.save()
+    buffer.seek(0)
+    yield from iter(lambda: buffer.read(chunk_size), b'')
+
+
+CONVERTERS = {
+    'txt': (convert_txt, 'text/plain; charset=utf-8'),
+    'csv': (convert_csv, 'text/csv; charset=utf-8'),
+    'pdf': (convert_pdf, 'application/pdf'),
+}
+
+
+def get_cart_hash(cart_items):
+    """
+    Хэш содержимого корзины для кэширования готового файла.
+
+    Args:
+        cart_items (Iterable[tuple]): Пары (ингредиент, количество).
+
+    Returns:
+        str: SHA-256 в шестнадцатеричном виде.
+    """
+    digest = hashlib.sha256()
+    for ingredient_id, total in cart_items:
+        digest.update(f'{ingredient_id}:{total};'.encode())
+    return digest.hexdigest()
+
+
+def cache_chunks(key, chunks):
+    """
+    Отдает части файла и сохраняет файл в кэш после полной генерации.
+    """
+    content = []
+    for chunk in chunks:
+        content.append(chunk)
+        yield chunk
+    cache.set(
+        key, b''.join(content), timeout=settings.SHOPPING_CART_CACHE_TIMEOUT
+    )
+
+
+def shopping_list_response(shop_list, file_format, cart_hash):
+    """
+    Потоковый ответ с файлом списка покупок в нужном формате.
+
+    Файл кэшируется по хэшу содержимого корзины: повторная загрузка
+    неизмененной корзины не генерирует файл заново.
+
+    Args:
+        shop_list (Iterable[dict]): Строки списка покупок.
+        file_format (str): Формат файла: txt, csv или pdf.
+        cart_hash (str): Хэш содержимого корзины.
+
+    Returns:
+        StreamingHttpResponse: Ответ с файлом.
+    """
+    converter, content_type = CONVERTERS[file_format]
+    key = f'shopping-list:{file_format}:{cart_hash}'
+    content = cache.get(key)
+    if content is None:
+        chunks = cache_chunks(key, converter(shop_list))
+    else:
+        chunks = [content]
+    file_name = os.path.splitext(settings.SHOPPING_CART_FILE_NAME)[0]
+    response = StreamingHttpResponse(chunks, content_type=content_type)
+    response['Content-Disposition'] = (
+        f'attachment; filename={file_name}.{file_format}'
+    )
     return response
@@ -0,0 +1,61 @@
+import time
+
+from django.core.cache import cache
+from django.db import transaction
+
+
+def version_key(scope):
+    return f'version:{scope}'
+
+
+def get_version(scope):
+    """
+    Возвращает метку версии данных, общую для всех воркеров.
+
+    Если метки нет в кэше, создается новая: после очистки кэша все
+    локальные копии данных считаются устаревшими.
+
+    Args:
+        scope (str): Имя набора данных, например 'ingredients'.
+
+    Returns:
+        int: Метка версии.
+    """
+    key = version_key(scope)
+    version = cache.get(key)
+    if version is None:
+        cache.add(key, time.time_ns(), timeout=None)
+        version = cache.get(key)
+    return version
+
+
+def get_versions(*scopes):
+    """
+    Возвращает метки нескольких наборов данных одним обращением к кэшу.
+
+    Args:
+        scopes (str): Имена наборов данных.
+
+    Returns:
+        dict: Метка версии по имени набора.
+    """
+    keys = {version_key(scope): scope for scope in scopes}
+    found = cache.get_many(keys)
+    versions = {keys[key]: version for key, version in found.items()}
+    for key, scope in keys.items():
+        if key not in found:
+            versions[scope] = get_version(scope)
+    return versions
+
+
+def bump_version(*scopes):
+    """
+    Обновляет метки версий после фиксации транзакции.
+
+    Args:
+        scopes (str): Имена наборов данных.
+    """
+    transaction.on_commit(lambda: cache.set_many(
+        {version_key(scope): time.time_ns() for scope in scopes},
+        timeout=None,
+    ))
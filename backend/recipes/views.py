@@ -1,24 +1,38 @@
-from django.db.models import Sum
+from django.conf import settings
+from django.db.models import F
 from django.shortcuts import get_object_or_404
 from django_filters.rest_framework import DjangoFilterBackend
 from rest_framework import status, viewsets
 from rest_framework.decorators import action
+from rest_framework.exceptions import NotFound
 from rest_framework.permissions import AllowAny, IsAuthenticated
 from rest_framework.response import Response
 from rest_framework.validators import ValidationError
 
-from recipes.filters import IngredientFilter, TagFilter
-from recipes.mixins import RetrieveListMixins
-from recipes.models import (Favorite, Ingredient, IngredientsInRecipe, Recipe,
-                            ShoppingCart)
-from recipes.pagination import CustomPagination
+from recipes import bulk, feed, pantry, ranking, similarity
+from recipes.autocomplete import search_ingredients
+from recipes.cache import recipe_version_scope, render_recipes
+from recipes.filters import (IngredientFilter, RecipeOrderingFilter,
+                             RecipeSearchFilter, TagFilter)
+from recipes import reference
+from recipes.mixins import (ConditionalGetMixin, KeysetPaginationMixin,
+                            ReferenceDataMixin, RetrieveListMixins)
+from recipes.models import (Favorite, FeedEntry, Ingredient, Recipe,
+                            ShoppingCart, ShoppingListItem)
+from recipes.pagination import (CustomPagination, FeedKeysetPagination,
+                                RecipeKeysetPagination)
 from recipes.permissions import IsOwnerOrReadOnly
-from recipes.serializers import (AddRecipeSerializer, IngredientSerializer,
+from recipes.renderers import (ShoppingListCSVRenderer, ShoppingListNegotiation,
+                               ShoppingListPDFRenderer,
+                               ShoppingListTextRenderer)
+from recipes.serializers import (SHORT_RECIPE_FIELDS, AddRecipeSerializer,
+                                 IngredientSerializer, RecipeIdsSerializer,
                                  RecipeSerializer, ShortRecipeSerializer)
-from recipes.utils import convert_txt
+from recipes.utils import get_cart_hash, shopping_list_response
 
 
-class IngredientViewSet(RetrieveListMixins):
+class IngredientViewSet(ConditionalGetMixin, ReferenceDataMixin,
+                        RetrieveListMixins):
     """
     ViewSet для ингредиентов.
 
@@ -27,15 +41,29 @@ class IngredientViewSet(RetrieveListMixins):
         serializer_class (Serializer): Сериализатор для ингредиентов.
         permission_classes (tuple): Кортеж с классами разрешений доступа.
         filterset_class (FilterSet): Фильтр для ингредиентов.
+        reference (ReferenceRegistry): Справочник ингредиентов в памяти.
+        version_scopes (tuple): Метки версий для условных запросов.
 
     """
     queryset = Ingredient.objects.all()
     serializer_class = IngredientSerializer
     permission_classes = (AllowAny,)
     filterset_class = IngredientFilter
+    reference = reference.ingredients
+    version_scopes = ('ingredients',)
+
+    def list(self, request, *args, **kwargs):
+        """
+        Список ингредиентов из справочника; при ?name= - подсказки из индекса.
+        """
+        name = request.query_params.get('name')
+        if name:
+            return Response(search_ingredients(name))
+        return super().list(request, *args, **kwargs)
 
 
-class RecipeViewSet(viewsets.ModelViewSet):
+class RecipeViewSet(ConditionalGetMixin, KeysetPaginationMixin,
+                    viewsets.ModelViewSet):
     """
     ViewSet для рецептов.
 
@@ -43,15 +71,71 @@ class RecipeViewSet(viewsets.ModelViewSet):
         queryset (QuerySet): Запрос для выборки рецептов из базы данных.
         permission_classes (tuple): Кортеж с классами разрешений доступа.
         pagination_class (Pagination): Класс пагинации для результатов запросов.
-        filter_backends (tuple): Кортеж с бэкендами фильтрации.
+        keyset_pagination_class (Pagination): Пагинация по курсору (?cursor=).
+        filter_backends (tuple): Кортеж с бэкендами фильтрации и поиска.
         filterset_class (FilterSet): Фильтр для рецептов.
+        version_scopes (tuple): Метки версий списка рецептов.
+        conditional_actions (tuple): Действия с условными ответами.
+        per_user (bool): ETag учитывает флаги текущего пользователя.
 
     """
     queryset = Recipe.objects.all()
     permission_classes = (IsOwnerOrReadOnly,)
     pagination_class = CustomPagination
-    filter_backends = (DjangoFilterBackend,)
+    keyset_pagination_class = RecipeKeysetPagination
+    filter_backends = (
+        DjangoFilterBackend, RecipeSearchFilter, RecipeOrderingFilter
+    )
     filterset_class = TagFilter
+    version_scopes = ('recipes',)
+    conditional_actions = ('list', 'retrieve', 'feed', 'similar')
+    per_user = True
+
+    def get_version_scopes(self):
+        if self.action == 'retrieve':
+            return (recipe_version_scope(self.kwargs['pk']),)
+        if self.action == 'similar':
+            return ('recipes', similarity.SIMILARITY_SCOPE)
+        if self.action == 'feed':
+            return ('recipes', feed.FEED_SCOPE)
+        if ranking.get_ordering(self.request):
+            return ('recipes', ranking.SCORES_SCOPE)
+        return super().get_version_scopes()
+
+    def get_queryset(self):
+        if self.action == 'list':
+            return Recipe.objects.only(
+                'id', 'pub_date', 'trending_score', 'popularity_score'
+            )
+        return Recipe.objects.all()
+
+    def list(self, request, *args, **kwargs):
+        """
+        Список рецептов из кэша представлений с флагами пользователя.
+
+        Из базы выбираются только идентификаторы страницы, сами
+        представления берутся из кэша одним multi-get.
+        """
+        queryset = self.filter_queryset(self.get_queryset())
+        page = self.paginate_queryset(queryset)
+        recipes = queryset if page is None else page
+        data = render_recipes([recipe.id for recipe in recipes], request)
+        if page is None:
+            return Response(data)
+        return self.get_paginated_response(data)
+
+    def retrieve(self, request, *args, **kwargs):
+        """
+        Рецепт из кэша представлений с флагами пользователя.
+        """
+        try:
+            recipe_id = int(kwargs[self.lookup_field])
+        except ValueError:
+            raise NotFound
+        data = render_recipes([recipe_id], request)
+        if not data:
+            raise NotFound
+        return Response(data[0])
 
     def get_serializer_class(self):
         if self.action in ('list', 'retrieve'):
@@ -62,6 +146,101 @@ class RecipeViewSet(viewsets.ModelViewSet):
         user = self.request.user
         serializer.save(author=user)
 
+    @action(detail=False)
+    def pantry(self, request):
+        """
+        Подбор рецептов по имеющимся продуктам.
+
+        Продукты передаются параметром ?ingredients=1,2,3 (или повтором
+        параметра). Сначала идут рецепты, для которых есть все
+        ингредиенты, затем с наименьшим числом недостающих; у каждого
+        рецепта есть список missing_ingredients.
+
+        Args:
+            request (Request): Запрос.
+
+        Returns:
+            Response: Список рецептов с недостающими ингредиентами.
+
+        """
+        values = ','.join(request.query_params.getlist('ingredients'))
+        try:
+            ingredient_ids = {
+                int(value) for value in values.split(',') if value.strip()
+            }
+        except ValueError:
+            raise ValidationError(
+                {'ingredients': 'Ожидаются идентификаторы ингредиентов'}
+            )
+        if not ingredient_ids:
+            raise ValidationError({'ingredients': 'Укажите продукты'})
+        if len(ingredient_ids) > settings.PANTRY_MAX_INGREDIENTS:
+            raise ValidationError({'ingredients': (
+                f'Не больше {settings.PANTRY_MAX_INGREDIENTS} продуктов'
+            )})
+        matches = dict(pantry.match_pantry(
+            ingredient_ids, settings.PANTRY_RESULTS_LIMIT
+        ))
+        data = render_recipes(list(matches), request)
+        for payload in data:
+            payload['missing_ingredients'] = matches[payload['id']]
+        return Response(data)
+
+    @action(detail=True)
+    def similar(self, request, pk=None):
+        """
+        Рецепты, похожие на данный по ингредиентам и тегам.
+
+        Списки рассчитываются заранее командой update_similar_recipes,
+        ответ - одно чтение по индексу и представления из кэша.
+
+        Args:
+            request (Request): Запрос.
+            pk (int): Идентификатор рецепта.
+
+        Returns:
+            Response: Список похожих рецептов по убыванию сходства.
+
+        """
+        try:
+            recipe_id = int(pk)
+        except ValueError:
+            raise NotFound
+        similar_ids = similarity.get_similar_ids(recipe_id)
+        if not similar_ids and not Recipe.objects.filter(
+            id=recipe_id
+        ).exists():
+            raise NotFound
+        return Response(render_recipes(similar_ids, request))
+
+    @action(
+        detail=False,
+        permission_classes=(IsAuthenticated,),
+        pagination_class=FeedKeysetPagination,
+        keyset_pagination_class=FeedKeysetPagination,
+    )
+    def feed(self, request):
+        """
+        Лента рецептов авторов, на которых подписан пользователь.
+
+        Страница читается из таблицы ленты пользователя по индексу
+        (user, pub_date, recipe) с курсором, представления рецептов
+        берутся из кэша.
+
+        Args:
+            request (Request): Запрос.
+
+        Returns:
+            Response: Страница ленты со ссылками next/previous.
+
+        """
+        entries = FeedEntry.objects.filter(user=request.user).only(
+            'recipe_id', 'pub_date'
+        )
+        page = self.paginate_queryset(entries)
+        data = render_recipes([entry.recipe_id for entry in page], request)
+        return self.get_paginated_response(data)
+
     @action(
         detail=True,
         methods=('post', 'delete'),
@@ -86,27 +265,85 @@ class RecipeViewSet(viewsets.ModelViewSet):
 
     @action(
         detail=False,
+        methods=('post', 'delete'),
+        url_path='favorite',
+        url_name='favorite-bulk',
+        permission_classes=(IsAuthenticated,)
+    )
+    def favorite_bulk(self, request):
+        """
+        Добавление или удаление списка рецептов из избранного.
+
+        Тело запроса: {"recipes": [id, ...]}.
+
+        Args:
+            request (Request): Запрос.
+
+        Returns:
+            Response: Добавленные рецепты или пустой ответ при удалении.
+
+        """
+        return self.change_recipes(Favorite, request)
+
+    @action(
+        detail=False,
+        methods=('post', 'delete'),
+        url_path='shopping_cart',
+        url_name='shopping-cart-bulk',
         permission_classes=(IsAuthenticated,)
     )
+    def shopping_cart_bulk(self, request):
+        """
+        Добавление или удаление списка рецептов из списка покупок.
+
+        Тело запроса: {"recipes": [id, ...]}.
+
+        Args:
+            request (Request): Запрос.
+
+        Returns:
+            Response: Добавленные рецепты или пустой ответ при удалении.
+
+        """
+        return self.change_recipes(ShoppingCart, request)
+
+    @action(
+        detail=False,
+        permission_classes=(IsAuthenticated,),
+        renderer_classes=(
+            ShoppingListTextRenderer,
+            ShoppingListCSVRenderer,
+            ShoppingListPDFRenderer,
+        ),
+        content_negotiation_class=ShoppingListNegotiation,
+    )
     def download_shopping_cart(self, request):
         """
-        Загрузка списка покупок в виде текстового файла.
+        Загрузка списка покупок в виде файла.
+
+        Формат выбирается параметром ?format=txt|csv|pdf или заголовком
+        Accept, по умолчанию txt. Файл отдается потоком и кэшируется
+        по хэшу содержимого корзины.
 
         Args:
             request (Request): Запрос.
 
         Returns:
-            Response: Текстовый файл с списком покупок.
+            StreamingHttpResponse: Файл со списком покупок.
 
         """
-        ingredients = IngredientsInRecipe.objects.filter(
-            recipe__shopping_cart__user=request.user
-        ).values(
-            'ingredient__name', 'ingredient__measurement_unit'
-        ).order_by(
-            'ingredient__name'
-        ).annotate(ingredient_total=Sum('amount'))
-        return convert_txt(ingredients)
+        items = ShoppingListItem.objects.filter(user=request.user)
+        cart_hash = get_cart_hash(items.order_by('ingredient_id').values_list(
+            'ingredient_id', 'total'
+        ))
+        ingredients = items.values(
+            'ingredient__name',
+            'ingredient__measurement_unit',
+            ingredient_total=F('total'),
+        ).order_by('ingredient__name').iterator()
+        return shopping_list_response(
+            ingredients, request.accepted_renderer.format, cart_hash
+        )
 
     @action(
         detail=True,
@@ -131,17 +368,39 @@ class RecipeViewSet(viewsets.ModelViewSet):
             return self.delete_recipe(ShoppingCart, request, pk)
 
     def add_recipe(self, model, request, pk):
-        recipe = get_object_or_404(Recipe, pk=pk)
-        user = self.request.user
-        if model.objects.filter(recipe=recipe, user=user).exists():
+        recipe = get_object_or_404(
+            Recipe.objects.only(*SHORT_RECIPE_FIELDS), pk=pk
+        )
+        if not bulk.add_recipes(model, request.user, [recipe.id]):
             raise ValidationError('Рецепт уже добавлен')
-        model.objects.create(recipe=recipe, user=user)
         serializer = ShortRecipeSerializer(recipe)
         return Response(data=serializer.data, status=status.HTTP_201_CREATED)
 
     def delete_recipe(self, model, request, pk):
-        recipe = get_object_or_404(Recipe, pk=pk)
-        user = self.request.user
-        obj = get_object_or_404(model, recipe=recipe, user=user)
-        obj.delete()
-        return Response(status=status.HTTP_204_NO_CONTENT)
\ No newline at end of file
+        try:
+            recipe_id = int(pk)
+        except ValueError:
+            raise NotFound
+        if not bulk.remove_recipes(model, request.user, [recipe_id]):
+            raise NotFound
+        return Response(status=status.HTTP_204_NO_CONTENT)
+
+    def change_recipes(self, model, request):
+        """
+        Добавляет или удаляет список рецептов одним запросом на запись.
+
+        Повторы и уже добавленные (или отсутствующие) рецепты пропускаются,
+        поэтому запрос можно безопасно повторить.
+        """
+        serializer = RecipeIdsSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        recipes = serializer.validated_data['recipes']
+        recipe_ids = [recipe.id for recipe in recipes]
+        if request.method == 'DELETE':
+            bulk.remove_recipes(model, request.user, recipe_ids)
+            return Response(status=status.HTTP_204_NO_CONTENT)
+        bulk.add_recipes(model, request.user, recipe_ids)
+        serializer = ShortRecipeSerializer(
+            recipes, many=True, context=self.get_serializer_context()
+        )
+        return Response(data=serializer.data, status=status.HTTP_201_CREATED)
\ No newline at end of file
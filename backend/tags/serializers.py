@@ -1,3 +1,4 @@
+from recipes import reference
 from rest_framework import serializers
 
 from tags.models import Tag
@@ -29,6 +30,9 @@ class TagField(serializers.SlugRelatedField):
         """
         Сериализует связанный тег.
 
+        Готовое представление берется из снимка справочника тегов, одного
+        на корневой сериализатор.
+
         Args:
             value: Объект тега.
 
@@ -36,6 +40,9 @@ class TagField(serializers.SlugRelatedField):
             dict: Сериализованный объект тега.
 
         """
+        data = reference.tags.for_serializer(self).get(value.pk)
+        if data is not None:
+            return dict(data)
         request = self.context.get('request')
         context = {'request': request}
         serializer = TagSerializer(value, context=context)
@@ -1,11 +1,13 @@
-from recipes.mixins import RetrieveListMixins
+from recipes import reference
+from recipes.mixins import (ConditionalGetMixin, ReferenceDataMixin,
+                            RetrieveListMixins)
 from rest_framework.permissions import AllowAny
 
 from tags.models import Tag
 from tags.serializers import TagSerializer
 
 
-class TagViewSet(RetrieveListMixins, ModelViewSet):
+class TagViewSet(ConditionalGetMixin, ReferenceDataMixin, RetrieveListMixins):
     """
     ViewSet для работы с тегами.
 
@@ -13,8 +15,12 @@ class TagViewSet(RetrieveListMixins, ModelViewSet):
         queryset (QuerySet): Запрос для выборки тегов из базы данных.
         serializer_class (Serializer): Сериализатор для тегов.
         permission_classes (tuple): Кортеж с классами разрешений доступа.
+        reference (ReferenceRegistry): Справочник тегов в памяти.
+        version_scopes (tuple): Метки версий для условных запросов.
 
     """
     queryset = Tag.objects.all()
     serializer_class = TagSerializer
     permission_classes = (AllowAny,)
+    reference = reference.tags
+    version_scopes = ('tags',)
@@ -1,4 +1,5 @@
 from django.contrib import admin
+from recipes.pagination import EstimatedCountPaginator
 
 from .models import Follow, User
 
@@ -10,16 +11,27 @@ class UserAdmin(admin.ModelAdmin):
         'last_name',
         'email',
         'username',
-        'password'
+        'recipes_count',
+        'followers_count',
     )
     search_fields = ('username', 'email', 'last_name',)
-    list_filter = ('username', 'email', 'first_name', 'last_name',)
+    list_filter = ('is_staff', 'is_active',)
+    paginator = EstimatedCountPaginator
+    show_full_result_count = False
 
 
 class FollowAdmin(admin.ModelAdmin):
     list_display = ('user', 'author',)
-    list_filter = ('user', 'author',)
-    search_fields = ('user__username', 'user__email',)
+    list_select_related = ('user', 'author')
+    search_fields = (
+        'user__username',
+        'user__email',
+        'author__username',
+        'author__email',
+    )
+    autocomplete_fields = ('user', 'author')
+    paginator = EstimatedCountPaginator
+    show_full_result_count = False
 
 
 admin.site.register(Follow, FollowAdmin)
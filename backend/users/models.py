@@ -2,12 +2,33 @@ from django.contrib.auth.models import AbstractUser
 from django.db import models
 
 
-class User(AbstractUser):
+class EditableFieldsSaveMixin:
+    """
+    Сохраняет существующий объект только по редактируемым полям.
+
+    Поля с editable=False (счетчики, рейтинги и т.п.) меняются запросами
+    UPDATE с F(); полное сохранение загруженного раньше объекта (PATCH
+    профиля, форма админки) не должно перезаписывать их прочитанными
+    значениями. Явно переданный update_fields не меняется.
+    """
+
+    def save(self, *args, **kwargs):
+        if not self._state.adding and kwargs.get('update_fields') is None:
+            kwargs['update_fields'] = [
+                field.name for field in self._meta.concrete_fields
+                if field.editable and not field.primary_key
+            ]
+        super().save(*args, **kwargs)
+
+
+class User(EditableFieldsSaveMixin, AbstractUser):
     """
     Расширенная модель пользователя.
 
     Атрибуты:
         email (str): Адрес электронной почты пользователя (уникальное поле).
+        recipes_count (int): Число рецептов пользователя.
+        followers_count (int): Число подписчиков пользователя.
         USERNAME_FIELD (str): Поле, используемое для аутентификации (в данном случае - email).
         REQUIRED_FIELDS (list): Список обязательных полей при создании пользователя.
 
@@ -27,6 +48,16 @@ class User(AbstractUser):
         verbose_name='email',
         help_text='Введите адрес электронной почты'
     )
+    recipes_count = models.PositiveIntegerField(
+        default=0,
+        editable=False,
+        verbose_name='Число рецептов'
+    )
+    followers_count = models.PositiveIntegerField(
+        default=0,
+        editable=False,
+        verbose_name='Число подписчиков'
+    )
 
     USERNAME_FIELD = 'email'
     REQUIRED_FIELDS = ['username', 'first_name', 'last_name']
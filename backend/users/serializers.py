@@ -1,7 +1,7 @@
 import recipes
 from django.conf import settings
 from djoser.serializers import UserSerializer
-from recipes.models import Recipe
+from recipes import membership
 from rest_framework import serializers
 
 from users.models import Follow, User
@@ -41,12 +41,12 @@ class CurrentUserSerializer(UserSerializer):
             bool: True, если текущий пользователь подписан, False в противном случае.
 
         """
+        if hasattr(obj, 'is_subscribed'):
+            return obj.is_subscribed
         request = self.context.get('request')
-        if request is None or request.user.is_anonymous:
+        if request is None:
             return False
-        return Follow.objects.filter(
-            user=request.user, author=obj
-        ).exists()
+        return membership.is_member(request.user, membership.FOLLOWS, obj.id)
 
     def create(self, validated_data):
         """
@@ -183,6 +183,32 @@ class SubscribeSerializer(serializers.ModelSerializer):
         return data
 
 
+def get_recipes_limit(request):
+    """
+    Число рецептов автора в списке подписок.
+
+    Берется из параметра recipes_limit (или устаревшего recipe_limit)
+    и ограничивается сверху SUBSCRIPTION_RECIPES_MAX_LIMIT.
+
+    Args:
+        request (Request): Текущий запрос.
+
+    Returns:
+        int: Число рецептов на автора.
+
+    """
+    value = None
+    if request is not None:
+        value = request.query_params.get(
+            'recipes_limit', request.query_params.get('recipe_limit')
+        )
+    try:
+        limit = int(value)
+    except (TypeError, ValueError):
+        return settings.SUBSCRIPTION_RECIPES_LIMIT
+    return max(0, min(limit, settings.SUBSCRIPTION_RECIPES_MAX_LIMIT))
+
+
 class SubscriptionSerializer(serializers.ModelSerializer):
     """
     Сериализатор для подписки пользователя на другого пользователя.
@@ -230,23 +256,26 @@ class SubscriptionSerializer(serializers.ModelSerializer):
 
     def get_is_subscribed(self, obj):
         """
-        Получает информацию о том, подписан ли текущий пользователь на данного пользователя.
+        Подписка текущего пользователя на автора.
+
+        Сериализатор выводит подписки текущего пользователя, поэтому
+        значение всегда True и не требует запроса.
 
         Args:
             obj (Follow): Объект подписки.
 
         Returns:
-            bool: True, если текущий пользователь подписан, False в противном случае.
+            bool: True.
 
         """
-        request = self.context.get('request')
-        return Follow.objects.filter(
-            author=obj.author, user=request.user
-        ).exists()
+        return True
 
     def get_recipes(self, obj):
         """
-        Получает информацию о рецептах пользователя, на которого подписан текущий пользователь.
+        Получает последние рецепты автора, на которого подписан текущий пользователь.
+
+        Список рецептов берется из предвыборки SubscriptionViewSet; если
+        ее нет, рецепты загружаются отдельным запросом с тем же лимитом.
 
         Args:
             obj (Follow): Объект подписки.
@@ -256,15 +285,13 @@ class SubscriptionSerializer(serializers.ModelSerializer):
 
         """
         request = self.context.get('request')
-        if request.GET.get('recipe_limit'):
-            recipe_limit = int(request.GET.get('recipe_limit'))
-            queryset = Recipe.objects.filter(
-                author=obj.author)[:recipe_limit]
-        else:
-            queryset = Recipe.objects.filter(
-                author=obj.author)
+        queryset = getattr(obj.author, 'latest_recipes', None)
+        if queryset is None:
+            queryset = obj.author.recipes.order_by('-pub_date', '-id')[
+                :get_recipes_limit(request)
+            ]
         serializer = recipes.serializers.ShortRecipeSerializer(
-            queryset, read_only=True, many=True
+            queryset, read_only=True, many=True, context=self.context
         )
         return serializer.data
 
@@ -279,4 +306,4 @@ class SubscriptionSerializer(serializers.ModelSerializer):
             int: Количество рецептов пользователя.
 
         """
-        return obj.author.recipes.count()
+        return obj.author.recipes_count
@@ -1,39 +1,55 @@
+from django.db.models import Prefetch
 from django.shortcuts import get_object_or_404
-from recipes.pagination import CustomPagination
+from recipes.mixins import KeysetPaginationMixin
+from recipes.models import Recipe
+from recipes.pagination import CustomPagination, FollowKeysetPagination
 from rest_framework import status, views
 from rest_framework.generics import ListAPIView
 from rest_framework.permissions import IsAuthenticated
 from rest_framework.response import Response
 
 from users.models import Follow, User
-from users.serializers import SubscribeSerializer, SubscriptionSerializer
+from users.serializers import (SubscribeSerializer, SubscriptionSerializer,
+                               get_recipes_limit)
 
 
-class SubscriptionViewSet(ListAPIView):
+class SubscriptionViewSet(KeysetPaginationMixin, ListAPIView):
     """
     Представление для получения списка подписок пользователя.
 
     Атрибуты:
         serializer_class (type): Класс сериализатора для подписок.
         pagination_class (type): Класс пагинации.
+        keyset_pagination_class (type): Пагинация по курсору (?cursor=).
         permission_classes (tuple): Классы разрешений.
 
     """
 
     serializer_class = SubscriptionSerializer
     pagination_class = CustomPagination
+    keyset_pagination_class = FollowKeysetPagination
     permission_classes = (IsAuthenticated,)
 
     def get_queryset(self):
         """
         Получает список подписок текущего пользователя.
 
+        Число рецептов берется из счетчика автора, а последние рецепты
+        всех авторов страницы выбираются одним запросом.
+
         Returns:
             QuerySet: QuerySet подписок текущего пользователя.
 
         """
         user = self.request.user
-        return user.follower.all()
+        latest = Recipe.objects.latest_per_author(
+            get_recipes_limit(self.request)
+        )
+        return user.follower.select_related('author').prefetch_related(
+            Prefetch(
+                'author__recipes', queryset=latest, to_attr='latest_recipes'
+            )
+        ).order_by('-id')
 
 
 class SubscribeView(views.APIView):